@@ -0,0 +1,217 @@
+import math
+
+import numpy as np
+
+from finance_kernel import payment_factor
+
+def annuity_payment(principal, monthly_rate, total_payments):
+    # Standard fixed-rate payment, using the shared cached payment factor
+    return principal * payment_factor(monthly_rate, total_payments)
+
+def _amortization_block(balance, total_interest, first_month, n_months, monthly_rate, payment, extra_payment, escrow, lump_sum=0):
+    # Remaining balance after each month of the block in closed form:
+    # B_k = B_0 * (1 + r)^k - (payment + extra) * ((1 + r)^k - 1) / r - lump * (1 + r)^(k - 1)
+    months = np.arange(first_month, first_month + n_months)
+    steps = np.arange(1, n_months + 1)
+    paid_per_month = payment + extra_payment
+    if monthly_rate == 0:
+        balances = balance - paid_per_month * steps - lump_sum
+    else:
+        growth = (1 + monthly_rate) ** steps
+        balances = balance * growth - paid_per_month * (growth - 1) / monthly_rate
+        if lump_sum:
+            balances -= lump_sum * growth / (1 + monthly_rate)
+
+    # Stop at the first month the balance reaches zero (early payoff from extra payments)
+    paid_off = np.flatnonzero(balances <= 0)
+    if paid_off.size:
+        end = paid_off[0] + 1
+        months = months[:end]
+        balances = balances[:end]
+    balances = np.maximum(balances, 0)  # Prevent negative balances
+
+    # Interest is charged on the balance carried into each month
+    opening_balance = np.concatenate(([balance], balances[:-1]))
+    interest = opening_balance * monthly_rate
+    principal_paid = payment - interest
+    total_interest_paid = np.cumsum(np.concatenate(([total_interest], interest)))[1:]
+
+    # A lump sum is paid on top of the first month of the block
+    extra_paid = np.full(len(months), float(extra_payment))
+    extra_paid[0] += lump_sum
+
+    # The payoff month is reported without payment, matching the month-by-month schedule
+    active = balances > 0
+    block = {
+        "Month": months,
+        "Monthly Payment": np.where(active, payment + escrow + extra_paid, 0),
+        "Principal Paid": np.where(active, principal_paid + extra_paid, 0),
+        "Interest Paid": np.where(active, interest, 0),
+        "Total Interest Paid": total_interest_paid,
+        "Remaining Balance": balances,
+    }
+    return block, paid_off.size > 0
+
+def iter_amortization_chunks(principal, monthly_rate, total_payments, extra_payment=0, escrow=0, chunk_size=120):
+    # Yield the schedule in blocks of at most chunk_size months, carrying only the balance between blocks
+    payment = annuity_payment(principal, monthly_rate, total_payments)
+    balance = principal
+    total_interest = 0
+    month = 1
+
+    while month <= total_payments:
+        n_months = min(chunk_size, total_payments - month + 1)
+        block, paid_off = _amortization_block(balance, total_interest, month, n_months, monthly_rate, payment, extra_payment, escrow)
+        yield block
+
+        # Stop if the loan is paid off early
+        if paid_off:
+            return
+        balance = block["Remaining Balance"][-1]
+        total_interest = block["Total Interest Paid"][-1]
+        month += n_months
+
+def amortization_schedule(principal, monthly_rate, total_payments, extra_payment=0, escrow=0):
+    # Whole schedule as a single block
+    return next(iter_amortization_chunks(principal, monthly_rate, total_payments, extra_payment, escrow, chunk_size=total_payments))
+
+def reamortize_from(balance, total_interest, first_month, monthly_rate, total_payments, payment, extra_payment=0, escrow=0, lump_sum=0):
+    # Recompute only the schedule from first_month onward, starting from the balance carried into it
+    block, _ = _amortization_block(balance, total_interest, first_month, total_payments - first_month + 1, monthly_rate, payment, extra_payment, escrow, lump_sum)
+    return block
+
+def annuity_payments(principal, monthly_rate, total_payments):
+    # Vectorized annuity_payment for arrays of loans
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = principal * monthly_rate / (1 - (1 + monthly_rate) ** -total_payments)
+    return np.where(monthly_rate == 0, principal / total_payments, payment)
+
+def balances_after(principal, monthly_rate, paid_per_month, months):
+    # Closed-form balance after the given number of months, broadcast over arrays of loans and months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + monthly_rate) ** months
+        balance = principal * growth - paid_per_month * (growth - 1) / monthly_rate
+    return np.where(monthly_rate == 0, principal - paid_per_month * months, balance)
+
+def months_to_zero(principal, monthly_rate, paid_per_month):
+    # Solve B_n = 0 for n with the annuity log formula (infinite when payments never cover the interest)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        months_needed = np.where(
+            monthly_rate == 0,
+            principal / paid_per_month,
+            -np.log1p(-monthly_rate * principal / paid_per_month) / np.log1p(monthly_rate)
+        )
+    return np.where(np.isnan(months_needed), np.inf, months_needed)
+
+def payoff_summary(principal, monthly_rate, total_payments, extra_payment=0):
+    # Payment, payoff month and total interest for arrays of loans without building schedules
+    principal, monthly_rate, total_payments, extra_payment = np.broadcast_arrays(
+        np.asarray(principal, dtype=float), np.asarray(monthly_rate, dtype=float),
+        np.asarray(total_payments), np.asarray(extra_payment, dtype=float)
+    )
+    payment = annuity_payments(principal, monthly_rate, total_payments)
+    paid_per_month = payment + extra_payment
+
+    # Round the months until the balance reaches zero up to a whole month
+    months_needed = months_to_zero(principal, monthly_rate, paid_per_month)
+    payoff_month = np.clip(np.ceil(months_needed - 1e-9), 1, total_payments).astype(int)
+
+    # Total interest is everything paid beyond the principal, measured before clamping the final balance
+    balance = balances_after(principal, monthly_rate, paid_per_month, payoff_month)
+    total_interest = balance - principal + paid_per_month * payoff_month
+
+    return {
+        "Monthly Payment": payment,
+        "Payoff Month": payoff_month,
+        "Total Interest Paid": total_interest,
+    }
+
+def segment_payoff_summary(principal, segment_rates, segment_lengths, extra_payment=0):
+    # Payoff summary for loans whose monthly rate changes between segments, vectorized over rate paths.
+    # segment_rates is (paths x segments); the payment is re-amortized over the remaining term at each segment.
+    segment_rates = np.atleast_2d(np.asarray(segment_rates, dtype=float))
+    n_paths = segment_rates.shape[0]
+    total_payments = sum(segment_lengths)
+
+    balance = np.full(n_paths, float(principal))
+    total_interest = np.zeros(n_paths)
+    max_payment = np.zeros(n_paths)
+    payoff_month = np.full(n_paths, total_payments)
+    active = np.ones(n_paths, dtype=bool)
+
+    first_month = 1
+    for segment, length in enumerate(segment_lengths):
+        # Each constant-rate segment is solved in closed form
+        monthly_rate = segment_rates[:, segment]
+        payment = annuity_payments(balance, monthly_rate, total_payments - first_month + 1)
+        paid_per_month = payment + extra_payment
+        max_payment = np.where(active, np.maximum(max_payment, payment), max_payment)
+
+        months_needed = months_to_zero(balance, monthly_rate, paid_per_month)
+        pays_off = active & (months_needed <= length + 1e-9)
+        months = np.where(pays_off, np.clip(np.ceil(months_needed - 1e-9), 1, length), length)
+        end_balance = balances_after(balance, monthly_rate, paid_per_month, months)
+
+        total_interest += np.where(active, end_balance - balance + paid_per_month * months, 0)
+        payoff_month = np.where(pays_off, first_month - 1 + months, payoff_month).astype(int)
+        balance = np.where(active & ~pays_off, end_balance, 0)
+        active &= ~pays_off
+        first_month += length
+
+    return {
+        "Max Monthly Payment": max_payment,
+        "Payoff Month": payoff_month,
+        "Total Interest Paid": total_interest,
+    }
+
+def segment_amortization_schedule(principal, segment_rates, segment_lengths, extra_payment=0, escrow=0):
+    # Schedule for a single rate path, built from one closed-form block per constant-rate segment
+    total_payments = sum(segment_lengths)
+    balance = principal
+    total_interest = 0
+    first_month = 1
+    blocks = []
+
+    for monthly_rate, length in zip(segment_rates, segment_lengths):
+        payment = annuity_payment(balance, monthly_rate, total_payments - first_month + 1)
+        block, paid_off = _amortization_block(balance, total_interest, first_month, length, monthly_rate, payment, extra_payment, escrow)
+        blocks.append(block)
+
+        # Stop if the loan is paid off early
+        if paid_off:
+            break
+        balance = block["Remaining Balance"][-1]
+        total_interest = block["Total Interest Paid"][-1]
+        first_month += length
+
+    return {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
+
+def solve_payoff(principal, monthly_rate, total_payments, extra_payment=0):
+    # Scalar payoff solution with plain math (no arrays, no loop), fast enough for interactive use
+    payment = annuity_payment(principal, monthly_rate, total_payments)
+    paid_per_month = payment + extra_payment
+
+    # Months until the balance reaches zero, from the annuity log formula
+    if monthly_rate == 0:
+        months_needed = principal / paid_per_month
+    elif paid_per_month > monthly_rate * principal:
+        months_needed = -math.log1p(-monthly_rate * principal / paid_per_month) / math.log1p(monthly_rate)
+    else:
+        months_needed = math.inf  # Payments never cover the interest
+    payoff_month = int(min(max(math.ceil(months_needed - 1e-9), 1), total_payments))
+
+    # Balance carried into the payoff month; the final payment clears it with that month's interest
+    if monthly_rate == 0:
+        final_balance = principal - paid_per_month * (payoff_month - 1)
+    else:
+        growth = (1 + monthly_rate) ** (payoff_month - 1)
+        final_balance = principal * growth - paid_per_month * (growth - 1) / monthly_rate
+    final_payment = final_balance * (1 + monthly_rate)
+    total_interest = paid_per_month * (payoff_month - 1) + final_payment - principal
+
+    return {
+        "Monthly Payment": payment,
+        "Payoff Month": payoff_month,
+        "Total Interest Paid": total_interest,
+        "Final Payment": final_payment,
+    }
@@ -0,0 +1,111 @@
+import numpy as np
+
+# Per-period rounding of interest (and of the scheduled payment) to whole cents
+ROUNDING_MODES = ("half_up", "half_even", "down", "up")
+
+# Annual rates are held as integers in units of 0.0001%, so monthly interest is balance * rate_units / RATE_DENOMINATOR
+RATE_SCALE = 10000
+RATE_DENOMINATOR = 100 * 12 * RATE_SCALE
+
+def to_cents(amount):
+    return np.rint(np.asarray(amount, dtype=float) * 100).astype(np.int64)
+
+def divide_rounded(numerator, denominator, rounding="half_up"):
+    # Integer division of non-negative int64 amounts, rounded to the nearest unit by the chosen mode
+    quotient, remainder = np.divmod(numerator, denominator)
+    if rounding == "half_up":
+        return quotient + (2 * remainder >= denominator)
+    if rounding == "half_even":
+        return quotient + ((2 * remainder > denominator) | ((2 * remainder == denominator) & (quotient % 2 == 1)))
+    if rounding == "down":
+        return quotient
+    if rounding == "up":
+        return quotient + (remainder > 0)
+    raise ValueError(f"Invalid rounding mode. Choose {', '.join(ROUNDING_MODES)}.")
+
+def cents_payment(principal_cents, rate_units, total_payments, rounding="half_up"):
+    # Scheduled payment in cents: the annuity payment, rounded once to a whole cent
+    monthly_rate = rate_units / RATE_DENOMINATOR
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = principal_cents * monthly_rate / (1 - (1 + monthly_rate) ** -total_payments)
+    payment = np.where(rate_units == 0, principal_cents / total_payments, payment)
+
+    # Round the payment with the same mode, on a 1/1000 cent grid to keep the float noise out of the tie cases
+    return divide_rounded(np.rint(payment * 1000).astype(np.int64), 1000, rounding)
+
+def cents_amortization(principal, interest_rate, total_payments, extra_payment=0, escrow=0, rounding="half_up", keep_schedule=True):
+    # Schedules for arrays of loans in int64 cents, as (loans x months) arrays. Interest is rounded to the cent every
+    # month; the month the balance is cleared (or the last scheduled month) pays the exact remaining balance, so every
+    # loan ends at exactly zero. With keep_schedule=False only the per-loan totals are kept, for large batches.
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"Invalid rounding mode. Choose {', '.join(ROUNDING_MODES)}.")
+    principal, interest_rate, total_payments, extra_payment, escrow = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(principal, dtype=float)), np.asarray(interest_rate, dtype=float),
+        np.asarray(total_payments, dtype=np.int64), np.asarray(extra_payment, dtype=float), np.asarray(escrow, dtype=float)
+    )
+    balance = to_cents(principal)
+    rate_units = np.rint(interest_rate * RATE_SCALE).astype(np.int64)
+    extra = to_cents(extra_payment)
+    escrow = to_cents(escrow)
+    payment = cents_payment(balance, rate_units, total_payments, rounding)
+
+    n_loans = len(balance)
+    n_months = int(total_payments.max()) if total_payments.size else 0
+    if keep_schedule:
+        interest_paid = np.zeros((n_loans, n_months), dtype=np.int64)
+        principal_paid = np.zeros((n_loans, n_months), dtype=np.int64)
+        remaining = np.zeros((n_loans, n_months), dtype=np.int64)
+    total_interest = np.zeros(n_loans, dtype=np.int64)
+    final_payment = np.zeros(n_loans, dtype=np.int64)
+    payoff_month = np.zeros(n_loans, dtype=np.int64)
+
+    # Month by month, every loan at once
+    for month in range(n_months):
+        active = (balance > 0) & (month < total_payments)
+        if not active.any():
+            break
+        interest = np.where(active, divide_rounded(balance * rate_units, RATE_DENOMINATOR, rounding), 0)
+        scheduled = payment + extra - interest
+        clears = (scheduled >= balance) | (month + 1 == total_payments)
+        principal_month = np.where(active, np.where(clears, balance, np.maximum(scheduled, 0)), 0)
+
+        balance = balance - principal_month
+        total_interest += interest
+        paid_off = active & (balance == 0)
+        payoff_month = np.where(paid_off, month + 1, payoff_month)
+        final_payment = np.where(paid_off, principal_month + interest, final_payment)
+        if keep_schedule:
+            interest_paid[:, month] = interest
+            principal_paid[:, month] = principal_month
+            remaining[:, month] = balance
+
+    result = {
+        "Scheduled Payment": payment,
+        "Payoff Month": payoff_month,
+        "Total Interest": total_interest,
+        "Final Payment": final_payment,
+    }
+    if keep_schedule:
+        active = np.arange(n_months) < payoff_month[:, None]
+        result.update({
+            "Interest Paid": interest_paid,
+            "Principal Paid": principal_paid,
+            "Monthly Payment": np.where(active, principal_paid + interest_paid + escrow[:, None], 0),
+            "Total Interest Paid": np.cumsum(interest_paid, axis=1),
+            "Remaining Balance": remaining,
+        })
+    return result
+
+def cents_amortization_schedule(principal, interest_rate, total_payments, extra_payment=0, escrow=0, rounding="half_up"):
+    # One loan's schedule in dollars (exact cent values), in the layout of amortization.amortization_schedule,
+    # ending with the actual final payment and a zero balance
+    result = cents_amortization(principal, interest_rate, total_payments, extra_payment, escrow, rounding)
+    months = int(result["Payoff Month"][0])
+    return {
+        "Month": np.arange(1, months + 1),
+        "Monthly Payment": result["Monthly Payment"][0, :months] / 100,
+        "Principal Paid": result["Principal Paid"][0, :months] / 100,
+        "Interest Paid": result["Interest Paid"][0, :months] / 100,
+        "Total Interest Paid": result["Total Interest Paid"][0, :months] / 100,
+        "Remaining Balance": result["Remaining Balance"][0, :months] / 100,
+    }
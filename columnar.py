@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+def allocate_columns(names, n_rows, dtype="float64"):
+    # Preallocated float columns for a calculator to fill in row by row
+    return {name: np.empty(n_rows, dtype=dtype) for name in names}
+
+def result_table(columns, dtype="float64", structured=False):
+    # Float columns in the requested precision (integer columns such as Period and Year stay integers),
+    # returned as a DataFrame or, with structured=True, as a NumPy structured array without building a DataFrame
+    columns = {
+        name: values.astype(dtype, copy=False) if values.dtype.kind == "f" else values
+        for name, values in ((name, np.asarray(values)) for name, values in columns.items())
+    }
+    if structured:
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        table = np.empty(n_rows, dtype=[(name, values.dtype) for name, values in columns.items()])
+        for name, values in columns.items():
+            table[name] = values
+        return table
+    # Read-only arrays (e.g. the cached calendar labels) are copied so the DataFrame can be edited
+    return pd.DataFrame({name: values if values.flags.writeable else values.copy() for name, values in columns.items()}, copy=False)
@@ -1,56 +1,69 @@
 import math
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
-def compound_interest(principal, annual_rate, contribution, frequency, total_duration, is_duration_in_years, annual_increase=0, inflation_rate=0):
-    freq_map = {"daily": 365, "weekly": 52, "bi-weekly": 26, "monthly": 12, "yearly": 1}
-    periods_per_year = freq_map.get(frequency, 12)
+from columnar import result_table
+from period_calendar import frequency_periods, period_index
+
+def compound_interest(principal, annual_rate, contribution, frequency, total_duration, is_duration_in_years, annual_increase=0, inflation_rate=0,
+                      dtype="float64", structured=False, start_date=None):
+    periods_per_year = frequency_periods(frequency)
     total_periods = total_duration * periods_per_year if is_duration_in_years else total_duration * periods_per_year // 12
 
     periodic_rate = (annual_rate / 100) / periods_per_year
-    results = []
-    balance = principal
-    total_contributions = principal
-    total_interest_earned = 0
-
-    for period in range(1, total_periods + 1):
-        # Add contributions at the start of each period
-        balance += contribution
-        total_contributions += contribution
-
-        # Calculate interest for the period
-        interest = balance * periodic_rate
-        balance += interest
-        total_interest_earned += interest
-
-        # Determine the current month
-        current_month = (period - 1) * 12 // periods_per_year + 1
-
-        # Apply inflation adjustment if applicable
-        real_balance = balance / ((1 + inflation_rate / 100) ** (current_month / 12)) if inflation_rate > 0 else None
-
-        # Append results for the period
-        result = {
-            "Period": period,
-            "Month": current_month,
-            "Year": (current_month - 1) // 12 + 1,
-            "Principal Paid": total_contributions,
-            "Interest Paid (This Period)": interest,
-            "Total Interest Paid": total_interest_earned,
-            "Balance": balance,
-        }
-        if inflation_rate > 0:
-            result["Real Balance"] = real_balance
-
-        results.append(result)
-
-        # Apply annual contribution increase
-        if period % periods_per_year == 0:
-            contribution *= (1 + annual_increase / 100)
-
-    return pd.DataFrame(results)
+    if total_periods <= 0:
+        return result_table({}, dtype, structured)
+
+    # Contributions are constant within each year and step up by annual_increase between years
+    total_years = -(-total_periods // periods_per_year)
+    yearly_contribution = contribution * np.cumprod(np.concatenate(([1.0], np.full(total_years - 1, 1 + annual_increase / 100))))
+
+    # Within a year, contributing at the start of each period grows the balance as a geometric series:
+    # B_k = B_0 * g^k + c * g * (g^k - 1) / r, with g = 1 + r (g^k - 1 taken via expm1/log1p so small rates keep their precision)
+    growth = 1 + periodic_rate
+    steps = np.arange(1, periods_per_year + 1)
+    step_gain = np.expm1(steps * np.log1p(periodic_rate))
+    step_growth = 1 + step_gain
+    step_annuity = growth * step_gain / periodic_rate if periodic_rate else steps.astype(float)
+
+    # Balance at the start of each year: B_y = G^y * (B_0 + S / G * sum_{j<y} c_j / G^j), with G = g^P and S the full-year annuity
+    year_growth = step_growth[-1]
+    year_powers = np.cumprod(np.full(total_years, year_growth)) / year_growth
+    discounted_contributions = np.concatenate(([0.0], np.cumsum(yearly_contribution / year_powers)[:-1]))
+    start_balance = year_powers * (principal + step_annuity[-1] / year_growth * discounted_contributions)
+
+    # Every period of every year at once, trimmed to the requested duration
+    balance = (start_balance[:, None] * step_growth + yearly_contribution[:, None] * step_annuity).ravel()[:total_periods]
+    contributions = np.repeat(yearly_contribution, periods_per_year)[:total_periods]
+    opening_balance = np.concatenate(([principal], balance[:-1]))
+    interest = (opening_balance + contributions) * periodic_rate
+
+    # Period, month and year labels (and dates) from the shared calendar
+    index = period_index(periods_per_year, total_periods, start_date)
+    current_month = index["Month"]
+
+    # Integer amounts stay integers until the first annual step-up, as they did when added one period at a time
+    principal_paid = principal + np.cumsum(contributions)
+    if all(isinstance(amount, (int, np.integer)) for amount in (principal, contribution)) and total_periods <= periods_per_year:
+        principal_paid = principal + contribution * index["Period"]
+
+    results = {
+        **index,
+        "Principal Paid": principal_paid,
+        "Interest Paid (This Period)": interest,
+        "Total Interest Paid": np.cumsum(interest),
+        "Balance": balance,
+    }
+
+    # Apply inflation adjustment if applicable, with one deflator per month
+    if inflation_rate > 0:
+        deflator = (1 + inflation_rate / 100) ** (np.arange(1, current_month[-1] + 1) / 12)
+        results["Real Balance"] = balance / deflator[current_month - 1]
+
+    return result_table(results, dtype, structured)
 
 def plot_investment_growth(df, file_name, display_by, inflation_rate):
     plt.figure(figsize=(12, 7))
@@ -122,7 +135,7 @@ if __name__ == "__main__":
             principal = float(input("Enter the initial principal amount: "))
             annual_rate = float(input("Enter the annual interest rate (in %): "))
             contribution = float(input("Enter the contribution amount per period: "))
-            frequency = input("Enter the contribution frequency (daily, weekly, bi-weekly, monthly, yearly): ").lower()
+            frequency = input("Enter the contribution frequency (daily, weekly, bi-weekly, monthly, quarterly, annually): ").lower()
             duration_input = input("Enter the total duration (e.g., '12 months' or '5 years'): ").lower()
             duration_parts = duration_input.split()
             duration = int(duration_parts[0])
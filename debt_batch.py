@@ -0,0 +1,94 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from debt_payoff import calculate_debt_payoff, debt_payoff_summary, export_to_excel, auto_adjust_column_width
+
+SUMMARY_COLUMNS = [
+    "Household ID", "Snowball Months", "Snowball Total Interest", "Avalanche Months", "Avalanche Total Interest",
+    "Interest Saved", "Months Saved", "Error",
+]
+
+def _parse_flag(value):
+    # CSV flags such as "yes", "True" or 1; anything else (including "no" and "False") is off
+    return str(value).strip().lower() in ("yes", "true", "1")
+
+def load_households(file_name):
+    # JSONL: one household per line with "household_id", "debts", and optional "extra_payment" and "write_schedule"
+    if file_name.lower().endswith((".jsonl", ".json")):
+        with open(file_name) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    # CSV: one debt per row, grouped by household_id
+    df = pd.read_csv(file_name)
+    households = []
+    for household_id, rows in df.groupby("household_id", sort=False):
+        households.append({
+            "household_id": household_id,
+            "debts": rows[["name", "balance", "interest_rate", "min_payment"]].to_dict("records"),
+            "extra_payment": float(rows["extra_payment"].iloc[0]) if "extra_payment" in rows.columns else 0,
+            "write_schedule": _parse_flag(rows["write_schedule"].iloc[0]) if "write_schedule" in rows.columns else False,
+        })
+    return households
+
+def compare_household(household, output_dir="."):
+    # Snowball vs. avalanche summary without building either wide DataFrame
+    # (a household whose payments never cover its interest is reported with its error instead of results)
+    extra_payment = household.get("extra_payment", 0)
+    summary = {"Household ID": household["household_id"]}
+    try:
+        for method in ("snowball", "avalanche"):
+            payoff = debt_payoff_summary(household["debts"], method, extra_payment)
+            label = method.capitalize()
+            summary[f"{label} Months"] = payoff["Months to Debt-Free"]
+            summary[f"{label} Total Interest"] = payoff["Total Interest Paid"]
+    except ValueError as e:
+        return {"Household ID": household["household_id"], "Error": str(e)}
+
+    summary["Interest Saved"] = summary["Snowball Total Interest"] - summary["Avalanche Total Interest"]
+    summary["Months Saved"] = summary["Snowball Months"] - summary["Avalanche Months"]
+    summary["Error"] = None
+
+    # Full schedules only for households that ask for them
+    if _parse_flag(household.get("write_schedule", False)):
+        for method in ("snowball", "avalanche"):
+            excel_file = os.path.join(output_dir, f"{household['household_id']}_{method}.xlsx")
+            export_to_excel(calculate_debt_payoff(household["debts"], method, extra_payment), excel_file)
+            auto_adjust_column_width(excel_file)
+
+    return summary
+
+def _compare_household_task(task):
+    return compare_household(*task)
+
+def compare_households(households, output_dir=".", workers=None):
+    # Fan households out across worker processes; only the summaries come back
+    tasks = [(household, output_dir) for household in households]
+    if workers == 1:
+        summaries = [_compare_household_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            summaries = list(executor.map(_compare_household_task, tasks, chunksize=64))
+    return pd.DataFrame(summaries, columns=SUMMARY_COLUMNS)
+
+if __name__ == "__main__":
+    while True:
+        try:
+            input_file = input("Enter the path to the households file (JSONL or CSV): ")
+            output_dir = input("Enter the directory for household schedules (optional, default is current directory): ") or "."
+            workers = int(input(f"Enter the number of worker processes (optional, default is {os.cpu_count()}): ") or os.cpu_count())
+            file_name = input("Enter the base name for the summary file (e.g., 'debt_comparison'): ")
+            break
+        except Exception as e:
+            print(f"Error: {e}. Please try again.")
+
+    summary_file = f"{file_name}.csv"
+    df = compare_households(load_households(input_file), output_dir, workers)
+    df.to_csv(summary_file, index=False)
+
+    print(f"Snowball vs. avalanche comparison for {len(df)} households saved to {summary_file}.")
+    failed = df["Error"].notna().sum()
+    if failed:
+        print(f"{failed} households could not be paid off; see the Error column.")
@@ -1,54 +1,380 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
-def calculate_debt_payoff(debts, method="snowball", extra_payment=0):
+from amortization import balances_after, months_to_zero
+
+def _sort_debts(debts, method):
     # Sort debts based on selected method
     if method == "snowball":
         debts = sorted(debts, key=lambda x: x["balance"])  # Smallest balance first
     elif method == "avalanche":
         debts = sorted(debts, key=lambda x: x["interest_rate"], reverse=True)  # Highest rate first
+    return debts
 
-    total_interest_paid = 0
-    results = []
-    month = 1
+def _debt_payoff_arrays(debts, method="snowball", extra_payment=0, layout="wide", dtype="float64"):
+    # layout="wide" fills (months x debts) grids; layout="long" appends only the rows of debts still being paid
+    # to flat buffers (month, debt code, and value columns in dtype), so memory follows the active rows
+    debts = _sort_debts(debts, method)
 
-    # Iterate until all debts are paid off
-    while any(debt["balance"] > 0 for debt in debts):
-        monthly_summary = {"Month": month, "Total Payment": 0, "Total Interest Paid": total_interest_paid}
-        extra_remaining = extra_payment
+    # Debt state as arrays, stepped together each month (debts that start paid off never appear)
+    debts = [debt for debt in debts if debt["balance"] > 0]
+    names = [debt["name"] for debt in debts]
+    balance = np.array([debt["balance"] for debt in debts], dtype=float)
+    rate = np.array([debt["interest_rate"] for debt in debts], dtype=float) / 100
+    minimum_payment = np.array([debt["min_payment"] for debt in debts], dtype=float)
 
-        for debt in debts:
-            if debt["balance"] <= 0:
-                continue  # Skip paid-off debts
+    # Preallocated output columns, grown by doubling when the payoff takes longer
+    capacity = 120
+    if layout == "long":
+        row_capacity = capacity * max(len(debts), 1)
+        row_month = np.empty(row_capacity, dtype=np.int32)
+        row_debt = np.empty(row_capacity, dtype=np.int32)
+        row_values = np.empty((3, row_capacity), dtype=dtype)
+        rows = 0
+    else:
+        balances = np.full((capacity, len(debts)), np.nan)
+        payments = np.full((capacity, len(debts)), np.nan)
+        interests = np.full((capacity, len(debts)), np.nan)
+    total_payment = np.zeros(capacity)
+    total_interest_paid = np.zeros(capacity)
 
-            interest = debt["balance"] * (debt["interest_rate"] / 100) / 12
-            minimum_payment = debt["min_payment"]
+    # Working arrays only hold the debts still being paid, indexed into the output columns by position
+    position = np.arange(len(debts))
+    total_interest = 0
+    month = 0
+
+    # Iterate until all debts are paid off
+    while position.size:
+        if month == capacity:
+            if layout != "long":
+                balances, payments, interests = (
+                    np.vstack([column, np.full_like(column, np.nan)]) for column in (balances, payments, interests)
+                )
+            total_payment, total_interest_paid = (np.concatenate([column, np.zeros(capacity)]) for column in (total_payment, total_interest_paid))
+            capacity *= 2
 
-            if debt["balance"] + interest <= minimum_payment:
-                payment = debt["balance"] + interest
-            else:
-                payment = minimum_payment + (extra_remaining if extra_remaining > 0 else 0)
+        interest = balance * rate / 12
+        pays_off = balance + interest <= minimum_payment
 
-            extra_remaining -= max(0, payment - (interest + minimum_payment))
-            principal_payment = payment - interest
-            debt["balance"] -= principal_payment
+        # Each debt that is not paid off this month hands the next one at most its own interest as extra
+        # payment, so the extra only changes at debts whose interest undercuts everything before them
+        extra_available = max(extra_payment, 0)
+        if extra_payment > 0:
+            passed_on = np.where(pays_off, np.inf, interest)
+            running_minimum = np.minimum.accumulate(np.concatenate(([extra_payment], passed_on[:-1])))
+            extra_available = np.full(len(balance), float(extra_payment))
+            extra_remaining = extra_payment
+            for i in np.flatnonzero(passed_on <= running_minimum):
+                extra_used = (minimum_payment[i] + max(extra_remaining, 0)) - (interest[i] + minimum_payment[i])
+                if extra_used > 0:
+                    extra_remaining -= extra_used
+                    extra_available[i + 1:] = max(extra_remaining, 0)
 
-            total_interest_paid += interest
+        payment = np.where(pays_off, balance + interest, minimum_payment + extra_available)
 
-            # Add debt details to summary
-            monthly_summary[f"Debt {debt['name']} Balance"] = debt["balance"]
-            monthly_summary[f"Debt {debt['name']} Payment"] = payment
-            monthly_summary[f"Debt {debt['name']} Interest"] = interest
+        # Once no balance shrinks, interest only grows and the payments only shrink, so nothing is ever paid off
+        if not (pays_off | (payment > interest)).any():
+            raise ValueError("Payments never cover the interest on the remaining debts.")
+        balance = balance - (payment - interest)
 
-        monthly_summary["Total Payment"] = sum(monthly_summary[f"Debt {debt['name']} Payment"] for debt in debts if f"Debt {debt['name']} Payment" in monthly_summary)
-        monthly_summary["Total Interest Paid"] = total_interest_paid
+        # Running totals are accumulated debt by debt (cumsum keeps the summation order)
+        total_interest = np.cumsum(np.concatenate(([total_interest], interest)))[-1]
 
-        results.append(monthly_summary)
+        if layout == "long":
+            if rows + len(position) > row_capacity:
+                row_capacity *= 2
+                row_month, row_debt = (np.resize(column, row_capacity) for column in (row_month, row_debt))
+                row_values = np.concatenate([row_values, np.empty_like(row_values)], axis=1)
+            row_month[rows:rows + len(position)] = month + 1
+            row_debt[rows:rows + len(position)] = position
+            row_values[:, rows:rows + len(position)] = (balance, payment, interest)
+            rows += len(position)
+        else:
+            balances[month, position] = balance
+            payments[month, position] = payment
+            interests[month, position] = interest
+        total_payment[month] = np.cumsum(payment)[-1]
+        total_interest_paid[month] = total_interest
         month += 1
 
-    return pd.DataFrame(results)
+        # Paid-off debts are skipped from next month on and stay empty in the output
+        still_owed = balance > 0
+        if not still_owed.all():
+            position, balance, rate, minimum_payment = (column[still_owed] for column in (position, balance, rate, minimum_payment))
+
+    result = {
+        "names": names,
+        "months": month,
+        "total_payment": total_payment[:month],
+        "total_interest_paid": total_interest_paid[:month],
+    }
+    if layout == "long":
+        result.update({"month": row_month[:rows], "debt": row_debt[:rows], "values": row_values[:, :rows]})
+    else:
+        result.update({"balances": balances[:month], "payments": payments[:month], "interests": interests[:month]})
+    return result
+
+def _wide_debt_frame(names, balances, payments, interests, total_payment, total_interest_paid):
+    # One row per month with Balance/Payment/Interest columns per debt (empty once a debt is paid off)
+    columns = {
+        "Month": np.arange(1, len(total_payment) + 1),
+        "Total Payment": total_payment,
+        "Total Interest Paid": total_interest_paid,
+    }
+    for i, name in enumerate(names):
+        columns[f"Debt {name} Balance"] = balances[:, i]
+        columns[f"Debt {name} Payment"] = payments[:, i]
+        columns[f"Debt {name} Interest"] = interests[:, i]
+    return pd.DataFrame(columns)
+
+def _long_debt_frame(names, month, debt, values):
+    # One row per debt per month it is still being paid, with compact month and categorical debt columns
+    balance, payment, interest = values
+    return pd.DataFrame({
+        "Month": month,
+        "Debt": pd.Categorical.from_codes(debt, names),
+        "Balance": balance,
+        "Payment": payment,
+        "Interest": interest,
+    }, copy=False)
+
+def calculate_debt_payoff(debts, method="snowball", extra_payment=0, output="wide", dtype="float64"):
+    # dtype sets the value columns of the long output; float32 halves them but only resolves cents below about $131,000
+    if output == "long":
+        payoff = _debt_payoff_arrays(debts, method, extra_payment, layout="long", dtype=dtype)
+        return _long_debt_frame(payoff["names"], payoff["month"], payoff["debt"], payoff["values"])
+    payoff = _debt_payoff_arrays(debts, method, extra_payment)
+    if not payoff["months"]:
+        return pd.DataFrame()  # Nothing to pay off
+
+    return _wide_debt_frame(
+        payoff["names"], payoff["balances"], payoff["payments"], payoff["interests"],
+        payoff["total_payment"], payoff["total_interest_paid"]
+    )
+
+def pivot_debt_schedule(df):
+    # Long schedule back to the wide layout (e.g. for the Excel sheet), scattered straight into arrays
+    names = list(df["Debt"].cat.categories)
+    total_months = int(df["Month"].max()) if len(df) else 0
+    month = df["Month"].to_numpy() - 1
+    debt = df["Debt"].cat.codes.to_numpy()
+
+    balances, payments, interests = (np.full((total_months, len(names)), np.nan) for _ in range(3))
+    balances[month, debt] = df["Balance"].to_numpy()
+    payments[month, debt] = df["Payment"].to_numpy()
+    interests[month, debt] = df["Interest"].to_numpy()
+
+    # Totals are accumulated debt by debt within each month, as in calculate_debt_payoff
+    total_payment = np.cumsum(np.nan_to_num(payments), axis=1)[:, -1] if names else np.zeros(total_months)
+    total_interest_paid = np.cumsum(np.nan_to_num(interests).ravel())[len(names) - 1::len(names)] if names else np.zeros(total_months)
+    return _wide_debt_frame(names, balances, payments, interests, total_payment, total_interest_paid)
+
+def debt_payoff_summary(debts, method="snowball", extra_payment=0):
+    # Months to debt-free and total interest from calculate_debt_payoff, without building the DataFrame
+    payoff = _debt_payoff_arrays(debts, method, extra_payment)
+    return {
+        "Months to Debt-Free": payoff["months"],
+        "Total Interest Paid": payoff["total_interest_paid"][-1] if payoff["months"] else 0,
+    }
+
+def _pay_off_target(state, target, monthly_rate, minimum_payment, extra_payment, focus=1.0):
+    # Jump from payoff event to payoff event until the target debt is paid off.
+    # Every unpaid debt pays its minimum; the pool (extra payment plus the minimums freed by paid-off debts)
+    # goes to the target, except for a (1 - focus) share spread over all unpaid debts by minimum payment.
+    balance = state["balance"].copy()
+    paid = state["paid"].copy()
+    payoff_month = state["payoff_month"].copy()
+    month = state["month"]
+    total_interest = state["total_interest"]
+    segments = state["segments"]
+
+    while not paid[target]:
+        unpaid = np.flatnonzero(~paid)
+        pool = extra_payment + minimum_payment[paid].sum()
+        payment = minimum_payment[unpaid].copy()
+        if focus < 1 and payment.sum() > 0:
+            payment += (1 - focus) * pool * payment / payment.sum()
+        payment[unpaid == target] += focus * pool
+
+        # Payments are constant until the next payoff, so every balance follows its closed-form path
+        start_balance, rate = balance[unpaid], monthly_rate[unpaid]
+        months_needed = np.ceil(months_to_zero(start_balance, rate, payment) - 1e-9)
+        if not np.isfinite(months_needed.min()):
+            raise ValueError("Payments never cover the interest on the remaining debts.")
+        months = max(int(months_needed.min()), 1)
+        pays_off = months_needed <= months
+
+        # Paid-off debts clear their balance plus that month's interest in the final payment
+        final_payment = balances_after(start_balance, rate, payment, months - 1) * (1 + rate)
+        end_balance = np.where(pays_off, 0, balances_after(start_balance, rate, payment, months))
+        total_interest += np.where(pays_off, payment * (months - 1) + final_payment, payment * months + end_balance).sum() - start_balance.sum()
+
+        if segments is not None:
+            segments = segments + [(month, months, unpaid, start_balance, rate, payment, pays_off)]
+        balance[unpaid] = end_balance
+        paid[unpaid[pays_off]] = True
+        payoff_month[unpaid[pays_off]] = month + months
+        month += months
+
+    return {
+        "balance": balance,
+        "paid": paid,
+        "payoff_month": payoff_month,
+        "month": month,
+        "total_interest": total_interest,
+        "segments": segments,
+    }
+
+def _expand_segments(segments, names, total_months):
+    # Monthly schedule (in the calculate_debt_payoff layout) rebuilt from the closed-form segments
+    balances = np.full((total_months, len(names)), np.nan)
+    payments = np.full((total_months, len(names)), np.nan)
+    interests = np.full((total_months, len(names)), np.nan)
+
+    for start_month, months, unpaid, start_balance, rate, payment, pays_off in segments:
+        steps = np.arange(1, months + 1)[:, None]
+        opening_balance = balances_after(start_balance, rate, payment, steps - 1)
+        closing_balance = balances_after(start_balance, rate, payment, steps)
+        segment_payment = np.broadcast_to(payment, closing_balance.shape).copy()
+        segment_payment[-1, pays_off] = opening_balance[-1, pays_off] * (1 + rate[pays_off])
+        closing_balance[-1, pays_off] = 0
+
+        rows = slice(start_month, start_month + months)
+        balances[rows, unpaid] = closing_balance
+        payments[rows, unpaid] = segment_payment
+        interests[rows, unpaid] = opening_balance * rate
+
+    return _wide_debt_frame(names, balances, payments, interests, np.nansum(payments, axis=1), np.cumsum(np.nansum(interests, axis=1)))
+
+def _initial_state(balance, expand_schedule=False):
+    return {
+        "balance": balance,
+        "paid": np.zeros(len(balance), dtype=bool),
+        "payoff_month": np.zeros(len(balance), dtype=int),
+        "month": 0,
+        "total_interest": 0.0,
+        "segments": [] if expand_schedule else None,
+    }
+
+def _debt_event_arrays(debts):
+    debts = [debt for debt in debts if debt["balance"] > 0]
+    names = [debt["name"] for debt in debts]
+    balance = np.array([debt["balance"] for debt in debts], dtype=float)
+    monthly_rate = np.array([debt["interest_rate"] for debt in debts], dtype=float) / 100 / 12
+    minimum_payment = np.array([debt["min_payment"] for debt in debts], dtype=float)
+    return names, balance, monthly_rate, minimum_payment
+
+def debt_payoff_events(debts, method="snowball", extra_payment=0, expand_schedule=False, order=None, focus=1.0):
+    # Event-driven snowball/avalanche: freed minimum payments roll into the next target debt,
+    # and the simulation jumps straight from one payoff to the next instead of stepping monthly.
+    # An explicit order of debt names overrides the method; focus < 1 spreads part of the pool over all debts.
+    names, balance, monthly_rate, minimum_payment = _debt_event_arrays(_sort_debts(debts, method))
+    targets = range(len(names)) if order is None else [names.index(name) for name in order if name in names]
+
+    state = _initial_state(balance, expand_schedule)
+    for target in targets:
+        state = _pay_off_target(state, target, monthly_rate, minimum_payment, extra_payment, focus)
+
+    return {
+        "Months to Debt-Free": state["month"],
+        "Total Interest Paid": state["total_interest"],
+        "Payoff Month": dict(zip(names, state["payoff_month"].tolist())),
+        "schedule": _expand_segments(state["segments"], names, state["month"]) if expand_schedule else None,
+    }
+
+def _search_orderings(task):
+    # Depth-first branch and bound over payoff orderings that start with the given debt.
+    # Interest and months only grow as more debts are paid off, so a partial ordering that is
+    # already no better than the best complete one cannot lead to an improvement.
+    balance, monthly_rate, minimum_payment, extra_payment, focus, first, objective, best_cost = task
+    best = {"cost": best_cost, "order": None}
+
+    # No debt can receive more than the whole monthly budget, so paying each remaining debt with the
+    # full budget bounds its interest from below, and the remaining balance bounds the months left
+    budget = extra_payment + minimum_payment.sum()
+
+    def lower_bound(state):
+        unpaid = ~state["paid"]
+        remaining_balance, rate = state["balance"][unpaid], monthly_rate[unpaid]
+        months = np.ceil(months_to_zero(remaining_balance, rate, budget) - 1e-9)
+        final_payment = balances_after(remaining_balance, rate, budget, months - 1) * (1 + rate)
+        interest = state["total_interest"] + (budget * (months - 1) + final_payment - remaining_balance).sum()
+        month = state["month"] + max(np.ceil(remaining_balance.sum() / budget - 1e-9), months.max(initial=0))
+        return (interest, month) if objective == "interest" else (month, interest)
+
+    # Try high-rate targets first for interest and small balances first for months, to tighten the bound early
+    preference = np.argsort(-monthly_rate) if objective == "interest" else np.argsort(balance)
+
+    def search(state, order):
+        cost = lower_bound(state)
+        if cost >= best["cost"]:
+            return
+        remaining = [debt for debt in preference if not state["paid"][debt]]
+        if not remaining:
+            best["cost"], best["order"] = cost, order
+            return
+        for debt in remaining:
+            try:
+                next_state = _pay_off_target(state, debt, monthly_rate, minimum_payment, extra_payment, focus)
+            except ValueError:
+                continue  # This target never gets paid off from here; its siblings may still work
+            search(next_state, order + [debt])
+
+    try:
+        state = _pay_off_target(_initial_state(balance), first, monthly_rate, minimum_payment, extra_payment, focus)
+    except ValueError:
+        return best["cost"], None, focus  # No ordering that starts with this debt pays it off
+    search(state, [first])
+    return best["cost"], best["order"], focus
+
+def optimize_debt_payoff(debts, extra_payment=0, objective="interest", focus_options=(1.0, 0.75, 0.5, 0.25), workers=None):
+    # Search payoff orderings and extra-payment splits for the lowest total interest ("interest")
+    # or the earliest debt-free date ("months"), starting from the better of snowball and avalanche
+    names, balance, monthly_rate, minimum_payment = _debt_event_arrays(debts)
+    key = (lambda result: (result["Total Interest Paid"], result["Months to Debt-Free"])) if objective == "interest" else (lambda result: (result["Months to Debt-Free"], result["Total Interest Paid"]))
+
+    # Only the heuristics that pay everything off seed the bound; the search may still find an ordering when neither does
+    candidates = []
+    for method in ("snowball", "avalanche"):
+        try:
+            candidates.append((debt_payoff_events(debts, method, extra_payment), method))
+        except ValueError:
+            pass
+    best_cost = min((key(result) for result, _ in candidates), default=(np.inf, np.inf))
+
+    # One task per (split, first debt), searched across a process pool
+    tasks = [
+        (balance, monthly_rate, minimum_payment, extra_payment, focus, first, objective, best_cost)
+        for focus in focus_options for first in range(len(names))
+    ]
+    if workers == 1:
+        results = [_search_orderings(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_search_orderings, tasks))
+
+    # Fall back to the better of snowball and avalanche if nothing beat it, and fail only if no ordering pays off
+    found = [result for result in results if result[1] is not None]
+    if found:
+        _, order, focus = min(found, key=lambda result: result[0])
+        order = [names[debt] for debt in order]
+    elif candidates:
+        best = min(candidates, key=lambda pair: key(pair[0]))[1]
+        order = [debt["name"] for debt in _sort_debts(debts, best) if debt["balance"] > 0]
+        focus = 1.0
+    else:
+        raise ValueError("Payments never cover the interest on the remaining debts.")
+
+    # Debts that were paid off by their minimum payments before becoming a target go last
+    result = debt_payoff_events(debts, extra_payment=extra_payment, order=order, focus=focus)
+    result["Order"] = order + sorted(set(result["Payoff Month"]) - set(order), key=result["Payoff Month"].get)
+    result["Focus"] = focus
+    return result
 
 def plot_debt_payoff(df, file_name):
     # Plot total debt balance over time
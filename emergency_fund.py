@@ -1,37 +1,138 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
-def calculate_emergency_fund(monthly_expenses, coverage_months, current_savings=0, contribution_amount=0, contribution_frequency="monthly"):
+from period_calendar import frequency_periods
+
+
+def _savings_after(current_savings, monthly_contribution, monthly_rate, months):
+    # Closed-form balance after the given months of contributions and monthly compounding
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = np.expm1(months * np.log1p(monthly_rate))
+        balance = current_savings * (1 + growth) + monthly_contribution * growth / monthly_rate
+    return np.where(monthly_rate == 0, current_savings + monthly_contribution * months, balance)
+
+def emergency_fund_months(monthly_expenses, coverage_months, current_savings=0, monthly_contribution=0, annual_return=0, inflation_rate=0):
+    # Months until savings cover the target, for arrays of households at once (inf when it is never reached).
+    # Savings earn annual_return (%) compounded monthly; expenses, and so the target, grow with inflation_rate (%).
+    monthly_expenses, coverage_months, current_savings, monthly_contribution, annual_return, inflation_rate = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in
+          (monthly_expenses, coverage_months, current_savings, monthly_contribution, annual_return, inflation_rate))
+    )
+    target_fund = monthly_expenses * coverage_months
+    monthly_rate = (annual_return / 100) / 12
+    inflation_log = np.log1p(inflation_rate / 100) / 12
+
+    # Fixed target: solve the savings balance for the target directly
+    with np.errstate(divide="ignore", invalid="ignore"):
+        months = np.where(
+            monthly_rate == 0,
+            (target_fund - current_savings) / monthly_contribution,
+            np.log((target_fund * monthly_rate + monthly_contribution) / (current_savings * monthly_rate + monthly_contribution)) / np.log1p(monthly_rate)
+        )
+
+    # Inflating target: the balance and the target each move monotonically, so within a year the gap can only reach
+    # zero if the larger year-end balance covers the smaller year-end target. Scan a year at a time (within 100 years)
+    # and check the months of every year where that can happen, so a crossing that inflation overtakes again before
+    # the year ends is still found
+    inflating = inflation_rate != 0
+    if inflating.any():
+        first_month = np.full(months.size, np.inf)
+        unresolved = (inflating & (current_savings < target_fund)).ravel()
+        start_balance, start_target = current_savings, target_fund
+        for year in range(1, 101):
+            end_balance = _savings_after(current_savings, monthly_contribution, monthly_rate, 12 * year)
+            end_target = target_fund * np.exp(inflation_log * 12 * year)
+            possible = unresolved & (np.maximum(start_balance, end_balance) >= np.minimum(start_target, end_target)).ravel()
+            if possible.any():
+                in_year = 12 * (year - 1) + np.arange(1, 13)
+                rows = np.flatnonzero(possible)
+                savings, contribution, rate, target, growth = (
+                    values.ravel()[rows][:, None] for values in (current_savings, monthly_contribution, monthly_rate, target_fund, inflation_log)
+                )
+                hit = _savings_after(savings, contribution, rate, in_year) >= target * np.exp(growth * in_year)
+                found = hit.any(axis=1)
+                first_month[rows[found]] = in_year[np.argmax(hit[found], axis=1)]
+                unresolved[rows[found]] = False
+            if not unresolved.any():
+                break
+            start_balance, start_target = end_balance, end_target
+        months = np.where(inflating, first_month.reshape(months.shape), months)
+
+    months = np.where(np.isnan(months) | (months < 0), np.inf, np.ceil(months - 1e-9))
+    return np.where(current_savings >= target_fund, 0, months)
+
+def emergency_fund_schedule(monthly_expenses, coverage_months, current_savings=0, monthly_contribution=0, annual_return=0, inflation_rate=0):
+    # Month-by-month progress for one household, up to the month the target is reached
+    months_needed = emergency_fund_months(monthly_expenses, coverage_months, current_savings, monthly_contribution, annual_return, inflation_rate)
+    if np.isinf(months_needed):
+        raise ValueError("The emergency fund target is never reached with these contributions.")
+    target_fund = monthly_expenses * coverage_months
+    month = np.arange(1, int(months_needed) + 1)
+
+    if annual_return == 0 and inflation_rate == 0:
+        # Plain running sum, so the balance (and the month it crosses the target) is the same as adding month by month
+        balance = np.cumsum(np.concatenate(([current_savings], np.full(len(month) + 1, monthly_contribution))))[1:]
+        month = np.arange(1, np.argmax(balance >= target_fund) + 2) if len(month) else month
+        balance = balance[:len(month)]
+        target = np.full(len(month), float(target_fund))
+    else:
+        balance = _savings_after(current_savings, monthly_contribution, (annual_return / 100) / 12, month)
+        target = target_fund * (1 + inflation_rate / 100) ** (month / 12)
+
+    return pd.DataFrame({
+        "Month": month,
+        "Savings Balance": balance,
+        "Target Fund": target,
+        "Remaining Amount": np.maximum(0, target - balance),
+    })
+
+def calculate_emergency_fund(monthly_expenses, coverage_months, current_savings=0, contribution_amount=0, contribution_frequency="monthly", annual_return=0, inflation_rate=0):
     # Calculate total target emergency fund
     target_fund = monthly_expenses * coverage_months
 
     # Map contribution frequency to periods
-    freq_map = {"daily": 365, "weekly": 52, "bi-weekly": 26, "monthly": 12}
-    contribution_periods_per_year = freq_map.get(contribution_frequency.lower(), 12)
+    contribution_periods_per_year = frequency_periods(contribution_frequency)
     contribution_per_period = contribution_amount / (12 / contribution_periods_per_year)
 
     # Savings progress
-    balance = current_savings
-    months_needed = 0
-    results = []
-
-    while balance < target_fund:
-        months_needed += 1
-        balance += contribution_per_period * (12 / contribution_periods_per_year)
-
-        results.append({
-            "Month": months_needed,
-            "Savings Balance": balance,
-            "Target Fund": target_fund,
-            "Remaining Amount": max(0, target_fund - balance)
-        })
-
-    # Create DataFrame
-    df = pd.DataFrame(results)
+    monthly_contribution = contribution_per_period * (12 / contribution_periods_per_year)
+    df = emergency_fund_schedule(monthly_expenses, coverage_months, current_savings, monthly_contribution, annual_return, inflation_rate)
     return df, target_fund
 
+HOUSEHOLD_COLUMNS = ["monthly_expenses", "coverage_months", "current_savings", "contribution_amount", "annual_return", "inflation_rate"]
+
+def _household_columns(households):
+    # Columnar arrays for a households table (optional columns default to 0)
+    return {
+        name: households[name].to_numpy(dtype=float) if name in households.columns else np.zeros(len(households))
+        for name in HOUSEHOLD_COLUMNS
+    }
+
+def emergency_fund_batch(households):
+    # Months needed for every household at once, without building any schedules
+    columns = _household_columns(households)
+    months_needed = emergency_fund_months(*columns.values())
+    target_fund = columns["monthly_expenses"] * columns["coverage_months"]
+    return pd.DataFrame({
+        "Household ID": households["household_id"].to_numpy() if "household_id" in households.columns else np.arange(1, len(households) + 1),
+        "Target Fund": target_fund,
+        "Months Needed": np.where(np.isinf(months_needed), np.nan, months_needed),
+        "Target Fund When Reached": target_fund * (1 + columns["inflation_rate"] / 100) ** (np.where(np.isinf(months_needed), np.nan, months_needed) / 12),
+    })
+
+def iter_emergency_fund_schedules(households):
+    # Schedules one household at a time, only as they are consumed (households that never reach the target are skipped)
+    columns = _household_columns(households)
+    household_ids = households["household_id"].to_numpy() if "household_id" in households.columns else np.arange(1, len(households) + 1)
+    for i, household_id in enumerate(household_ids):
+        try:
+            yield household_id, emergency_fund_schedule(*(values[i] for values in columns.values()))
+        except ValueError:
+            continue
+
 def plot_emergency_fund(df, file_name):
     # Plot savings progress
     plt.figure(figsize=(12, 7))
@@ -94,13 +195,33 @@ def export_to_excel(df, file_name):
     workbook.save(file_name)
 
 if __name__ == "__main__":
+    households_file = input("Enter a households CSV for batch mode (optional, leave blank for a single household): ").strip()
+    if households_file:
+        households = pd.read_csv(households_file)
+        file_name = input("Enter the base name for the summary file (e.g., 'emergency_funds'): ")
+        summary_file = f"{file_name}.csv"
+        emergency_fund_batch(households).to_csv(summary_file, index=False)
+        print(f"Months needed for {len(households)} households saved to {summary_file}.")
+
+        # Schedules are only built for the households actually exported
+        if input("Do you want an Excel schedule per household? (yes or no, default is no): ").lower() == "yes":
+            for household_id, df in iter_emergency_fund_schedules(households):
+                excel_file = f"{file_name}_{household_id}.xlsx"
+                export_to_excel(df, excel_file)
+                auto_adjust_column_width(excel_file)
+            print("Household schedules saved.")
+        raise SystemExit
+
     while True:
         try:
             monthly_expenses = float(input("Enter your total monthly expenses: "))
             coverage_months = int(input("Enter the desired coverage period (in months): "))
             current_savings = float(input("Enter your current savings amount (optional, default is 0): ") or 0)
             contribution_amount = float(input("Enter your planned contribution amount (optional, default is 0): ") or 0)
-            contribution_frequency = input("Enter the contribution frequency (daily, weekly, bi-weekly, monthly): ").lower()
+            contribution_frequency = input("Enter the contribution frequency (daily, weekly, bi-weekly, monthly, quarterly, annually): ").lower()
+            annual_return = float(input("Enter the annual interest rate on your savings (in %, optional, default is 0): ") or 0)
+            inflation_rate = float(input("Enter the annual inflation rate for your expenses (in %, optional, default is 0): ") or 0)
+            df, target_fund = calculate_emergency_fund(monthly_expenses, coverage_months, current_savings, contribution_amount, contribution_frequency, annual_return, inflation_rate)
             file_name = input("Enter the base name for the output files (e.g., 'emergency_fund'): ")
             break
         except Exception as e:
@@ -109,7 +230,6 @@ if __name__ == "__main__":
     image_file = f"{file_name}.png"
     excel_file = f"{file_name}.xlsx"
 
-    df, target_fund = calculate_emergency_fund(monthly_expenses, coverage_months, current_savings, contribution_amount, contribution_frequency)
     plot_emergency_fund(df, image_file)
     export_to_excel(df, excel_file)
     embed_chart_in_excel(excel_file, image_file)
@@ -0,0 +1,27 @@
+from functools import lru_cache
+
+# Maximum number of (rate, periods) pairs kept per factor
+CACHE_SIZE = 4096
+
+@lru_cache(maxsize=CACHE_SIZE)
+def discount_factor(rate, periods):
+    # Present value of 1 paid after the given number of periods: (1 + rate)^-periods
+    return (1 + rate) ** -periods
+
+@lru_cache(maxsize=CACHE_SIZE)
+def payment_factor(rate, periods):
+    # Level payment per 1 of principal (zero-rate loans are repaid in equal parts)
+    if rate == 0:
+        return 1 / periods
+    return rate / (1 - discount_factor(rate, periods))
+
+def cache_info():
+    # Hit and miss counters for each cached factor
+    return {
+        "discount_factor": discount_factor.cache_info()._asdict(),
+        "payment_factor": payment_factor.cache_info()._asdict(),
+    }
+
+def clear_cache():
+    discount_factor.cache_clear()
+    payment_factor.cache_clear()
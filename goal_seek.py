@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+SOLVE_FOR = ("contribution", "annual_rate", "years", "current_savings")
+
+def _periods(growth_log, periodic_rate, n):
+    # Value of n end-of-period payments of 1: ((1 + r)^n - 1) / r, written to stay accurate as r approaches 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.expm1(n * growth_log) / periodic_rate
+    return np.where(periodic_rate == 0, n, annuity)
+
+def future_value(current_savings, contribution, annual_rate, years, periods_per_year=12, annual_increase=0):
+    # Closed-form balance after the given years with end-of-period contributions that step up by annual_increase (%)
+    # once a year, broadcast over arrays of scenarios. annual_rate is an effective annual return (%), as in savings_goal.
+    current_savings, contribution, annual_rate, years, annual_increase = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (current_savings, contribution, annual_rate, years, annual_increase))
+    )
+    growth_log = np.log1p(annual_rate / 100) / periods_per_year
+    periodic_rate = np.expm1(growth_log)
+    step_up = 1 + annual_increase / 100
+
+    total_periods = years * periods_per_year
+    full_years = np.floor(total_periods / periods_per_year + 1e-12)
+    remaining = np.maximum(total_periods - full_years * periods_per_year, 0)
+
+    # Full years: sum over y < Y of step_up^y * G^(Y - 1 - y), with G the growth over one year
+    year_annuity = _periods(growth_log, periodic_rate, periods_per_year)
+    ratio_log = np.log(step_up) - periods_per_year * growth_log
+    with np.errstate(divide="ignore", invalid="ignore"):
+        geometric = np.where(np.abs(ratio_log) < 1e-12, full_years, np.expm1(full_years * ratio_log) / np.expm1(ratio_log))
+    years_growth = np.exp((full_years - 1) * periods_per_year * growth_log)
+    full_years_value = year_annuity * years_growth * geometric * np.exp(remaining * growth_log)
+
+    # Then the periods of the partial final year, at the stepped-up contribution
+    partial_value = step_up ** full_years * _periods(growth_log, periodic_rate, remaining)
+
+    return current_savings * np.exp(total_periods * growth_log) + contribution * (full_years_value + partial_value)
+
+def seek_root(gap, lo, hi, tol, max_iter):
+    # Vectorized safeguarded Newton: take the Newton step when it stays inside the sign-change bracket, else bisect
+    gap_lo, gap_hi = gap(lo), gap(hi)
+    bracketed = np.sign(gap_lo) != np.sign(gap_hi)
+    x = (lo + hi) / 2
+    moved = np.full(x.shape, np.inf)
+    for _ in range(max_iter):
+        gap_x = gap(x)
+        same_side = np.sign(gap_x) == np.sign(gap_lo)
+        lo = np.where(same_side, x, lo)
+        hi = np.where(same_side, hi, x)
+        converged = (np.minimum(hi - lo, moved) <= tol * (1 + np.abs(x))) | (gap_x == 0)
+        if np.all(~bracketed | converged):
+            break
+
+        step = 1e-6 * (1 + np.abs(x))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (gap(x + step) - gap(x - step)) / (2 * step)
+            newton = x - gap_x / slope
+        inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        next_x = np.where(converged, x, np.where(inside, newton, (lo + hi) / 2))
+        moved, x = np.abs(next_x - x), next_x
+    return np.where(bracketed, x, np.nan)
+
+def goal_seek(solve_for, target_amount, current_savings=0, contribution=0, annual_rate=0, years=0, periods_per_year=12,
+              annual_increase=0, inflation_rate=0, tol=1e-10, max_iter=100):
+    # Solve for one unknown so the balance reaches the inflation-adjusted target, for a batch of scenarios at once.
+    # Rates are in %; the unknown's own argument is ignored. Unreachable goals come back as NaN.
+    if solve_for not in SOLVE_FOR:
+        raise ValueError(f"Invalid unknown. Choose {', '.join(SOLVE_FOR)}.")
+    target_amount, current_savings, contribution, annual_rate, years, annual_increase, inflation_rate = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in
+          (target_amount, current_savings, contribution, annual_rate, years, annual_increase, inflation_rate))
+    )
+
+    def adjusted_goal(years):
+        return target_amount / (1 + inflation_rate / 100) ** years
+
+    # The balance is linear in the contribution and the starting balance, so those are solved directly
+    if solve_for == "contribution":
+        growth_only = future_value(current_savings, 0, annual_rate, years, periods_per_year)
+        per_contribution = future_value(0, 1, annual_rate, years, periods_per_year, annual_increase)
+        return (adjusted_goal(years) - growth_only) / per_contribution
+    if solve_for == "current_savings":
+        contributions_only = future_value(0, contribution, annual_rate, years, periods_per_year, annual_increase)
+        return (adjusted_goal(years) - contributions_only) / future_value(1, 0, annual_rate, years, periods_per_year)
+
+    if solve_for == "annual_rate":
+        def gap(rate):
+            return future_value(current_savings, contribution, rate, years, periods_per_year, annual_increase) - adjusted_goal(years)
+        lo, hi = np.full(target_amount.shape, -99.0), np.full(target_amount.shape, 1000.0)
+    else:
+        def gap(years):
+            return future_value(current_savings, contribution, annual_rate, years, periods_per_year, annual_increase) - adjusted_goal(years)
+        lo, hi = np.zeros(target_amount.shape), np.full(target_amount.shape, 200.0)
+
+    with np.errstate(over="ignore"):
+        return seek_root(gap, lo, hi, tol, max_iter)
+
+def goal_seek_scenarios(scenarios, solve_for, periods_per_year=12):
+    # One scenario per row, with columns named like goal_seek's arguments (missing ones default to 0)
+    arguments = {
+        name: scenarios[name].to_numpy(dtype=float) if name in scenarios.columns else 0
+        for name in ("target_amount", "current_savings", "contribution", "annual_rate", "years", "annual_increase", "inflation_rate")
+    }
+    df = scenarios.copy()
+    df[solve_for] = goal_seek(solve_for, periods_per_year=periods_per_year, **arguments)
+    return df
+
+if __name__ == "__main__":
+    while True:
+        try:
+            input_file = input("Enter the path to the scenarios CSV: ")
+            solve_for = input(f"Enter the unknown to solve for ({', '.join(SOLVE_FOR)}): ").lower()
+            periods_per_year = int(input("Enter the number of contributions per year (optional, default is 12): ") or 12)
+            file_name = input("Enter the base name for the output file (e.g., 'goal_seek'): ")
+            break
+        except Exception as e:
+            print(f"Error: {e}. Please try again.")
+
+    output_file = f"{file_name}.csv"
+    df = goal_seek_scenarios(pd.read_csv(input_file), solve_for, periods_per_year)
+    df.to_csv(output_file, index=False)
+
+    print(f"Solved {solve_for} for {len(df)} scenarios saved to {output_file}.")
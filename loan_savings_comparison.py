@@ -1,19 +1,24 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
+from amortization import annuity_payments
+from finance_kernel import payment_factor
+from goal_seek import seek_root
+from period_calendar import frequency_periods, period_index
+
 def loan_vs_savings(expense_amount, current_savings, loan_rate, loan_term_years, return_rate, inflation_rate, savings_term_months, savings_frequency="monthly"):
     # Loan scenario calculations
     loan_term_months = loan_term_years * 12
     monthly_loan_rate = (loan_rate / 100) / 12
-    monthly_payment = expense_amount * monthly_loan_rate / (1 - (1 + monthly_loan_rate) ** -loan_term_months)
+    monthly_payment = expense_amount * payment_factor(monthly_loan_rate, loan_term_months)
     total_loan_cost = monthly_payment * loan_term_months
     total_loan_interest = total_loan_cost - expense_amount
 
     # Savings scenario calculations
-    freq_map = {"daily": 365, "weekly": 52, "bi-weekly": 26, "monthly": 12}
-    periods_per_year = freq_map.get(savings_frequency.lower(), 12)
+    periods_per_year = frequency_periods(savings_frequency)
     savings_periods = savings_term_months * (periods_per_year / 12)
     inflation_adjusted_goal = expense_amount / ((1 + inflation_rate / 100) ** (savings_term_months / 12))
     periodic_rate = (1 + return_rate / 100) ** (1 / periods_per_year) - 1
@@ -23,6 +28,10 @@ def loan_vs_savings(expense_amount, current_savings, loan_rate, loan_term_years,
         ((1 + periodic_rate) ** savings_periods - 1) / periodic_rate
     )
 
+    # Whole months elapsed at the end of each period, from the shared calendar (the month the next period falls in, less one)
+    elapsed_months = period_index(periods_per_year, int(savings_periods) + 1)["Month"][1:] - 1
+    time_labels = [f"{months // 12}y {months % 12}m" if months >= 12 else f"{months}m" for months in elapsed_months.tolist()]
+
     savings_data = []
     savings_balance = current_savings
 
@@ -30,14 +39,9 @@ def loan_vs_savings(expense_amount, current_savings, loan_rate, loan_term_years,
         interest = savings_balance * periodic_rate
         savings_balance += interest + required_contribution
 
-        # Calculate time in months and years
-        time_in_months = (period / periods_per_year) * 12
-        years = int(time_in_months // 12)
-        months = int(time_in_months % 12)
-
         savings_data.append({
             "Period": period,
-            "Time (Years/Months)": f"{years}y {months}m" if years > 0 else f"{months}m",
+            "Time (Years/Months)": time_labels[period - 1],
             "Contribution": required_contribution,
             "Interest Earned": interest,
             "Savings Balance": savings_balance,
@@ -63,6 +67,57 @@ def loan_vs_savings(expense_amount, current_savings, loan_rate, loan_term_years,
         "savings_data": pd.DataFrame(savings_data),
     }
 
+def loan_vs_savings_grid(expense_amount, current_savings, loan_rates, loan_term_years, return_rates, inflation_rates, savings_terms_months, savings_frequency="monthly"):
+    # Every combination of loan rate, return rate, inflation rate and savings term in one pass, as arrays shaped
+    # (loan rates x return rates x inflation rates x savings terms), except the break-even loan rate, which has no
+    # loan rate axis; no per-period rows are built
+    loan_rates, return_rates, inflation_rates, savings_terms_months = (
+        np.asarray(values, dtype=float) for values in (loan_rates, return_rates, inflation_rates, savings_terms_months)
+    )
+    loan_rate = loan_rates[:, None, None, None]
+    return_rate = return_rates[None, :, None, None]
+    inflation_rate = inflation_rates[None, None, :, None]
+    savings_term = savings_terms_months[None, None, None, :]
+
+    # Loan scenario
+    loan_term_months = loan_term_years * 12
+
+    def loan_total_cost(loan_rate):
+        return expense_amount * loan_term_months * annuity_payments(1.0, (loan_rate / 100) / 12, loan_term_months)
+
+    # Savings scenario: required contribution and what the saver pays in total (current savings plus contributions)
+    periods_per_year = frequency_periods(savings_frequency)
+    savings_periods = savings_term * (periods_per_year / 12)
+    inflation_adjusted_goal = expense_amount / ((1 + inflation_rate / 100) ** (savings_term / 12))
+    periodic_rate = (1 + return_rate / 100) ** (1 / periods_per_year) - 1
+    growth = (1 + periodic_rate) ** savings_periods
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(periodic_rate == 0, savings_periods, (growth - 1) / periodic_rate)
+    required_contribution = (inflation_adjusted_goal - current_savings * growth) / annuity
+    savings_total_cost = np.broadcast_to(current_savings + required_contribution * savings_periods, required_contribution.shape)
+
+    # The savings surfaces do not depend on the loan rate; they are broadcast along it so every surface has the same shape
+    shape = (len(loan_rates),) + savings_total_cost.shape[1:]
+    total_cost = np.broadcast_to(loan_total_cost(loan_rate), shape)
+
+    # Break-even loan rate: the loan is cheaper below it and saving up is cheaper above it. It is negative when saving
+    # costs less than the expense itself, and NaN when it falls outside -50% to 100%.
+    def gap(loan_rate):
+        return loan_total_cost(loan_rate) - savings_total_cost[0]
+    break_even = seek_root(gap, np.full(shape[1:], -50.0), np.full(shape[1:], 100.0), 1e-10, 100)
+
+    return {
+        "Loan Rate": loan_rates,
+        "Return Rate": return_rates,
+        "Inflation Rate": inflation_rates,
+        "Savings Term (Months)": savings_terms_months,
+        "Loan Total Cost": total_cost,
+        "Required Contribution": np.broadcast_to(required_contribution, shape),
+        "Savings Total Cost": np.broadcast_to(savings_total_cost, shape),
+        "Loan Cost Minus Savings Cost": total_cost - savings_total_cost,
+        "Break-even Loan Rate": break_even,
+    }
+
 def plot_comparison(loan_cost, savings_balance, savings_data, file_name):
     # Determine the x-axis label based on savings timeframe
     total_periods = len(savings_data)
@@ -182,7 +237,7 @@ if __name__ == "__main__":
         return_rate = float(input("Enter the expected annual return rate on investments (in %, e.g., 5): "))
         inflation_rate = float(input("Enter the expected annual inflation rate (in %, optional, default is 0): ") or 0)
         savings_term_months = int(input("Enter the timeframe for saving the expense amount (in months): "))
-        savings_frequency = input("Enter the savings contribution frequency ('daily', 'weekly', 'bi-weekly', 'monthly'): ").lower()
+        savings_frequency = input("Enter the savings contribution frequency ('daily', 'weekly', 'bi-weekly', 'monthly', 'quarterly', 'annually'): ").lower()
         file_name = input("Enter the base name for the output files (e.g., 'savings_vs_loan'): ")
 
         # Perform calculations
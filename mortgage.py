@@ -1,49 +1,165 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
-def mortgage_calculator(principal, interest_rate, loan_term, property_tax=0, insurance=0, pmi=0, extra_payment=0):
+from amortization import (
+    amortization_schedule, annuity_payment, iter_amortization_chunks, payoff_summary, reamortize_from,
+    segment_amortization_schedule, segment_payoff_summary, solve_payoff
+)
+from cents_amortization import ROUNDING_MODES, cents_amortization_schedule
+
+def mortgage_calculator(principal, interest_rate, loan_term, property_tax=0, insurance=0, pmi=0, extra_payment=0, rounding=None):
     # Monthly interest rate and total number of payments
     monthly_rate = (interest_rate / 100) / 12
     total_payments = loan_term * 12
 
-    # Calculate base monthly payment (excluding taxes and insurance)
-    monthly_payment = principal * monthly_rate / (1 - (1 + monthly_rate) ** -total_payments)
-
-    # Include property tax, insurance, and PMI
-    monthly_payment += property_tax + insurance + pmi
-
-    # Amortization schedule
-    balance = principal
-    total_interest_paid = 0
-    results = []
-
-    for month in range(1, total_payments + 1):
-        interest = balance * monthly_rate
-        principal_paid = (monthly_payment - (property_tax + insurance + pmi)) - interest
-        total_interest_paid += interest
-        balance -= (principal_paid + extra_payment)
-        balance = max(balance, 0)  # Prevent negative balances
-
-        results.append({
-            "Month": month,
-            "Monthly Payment": monthly_payment + extra_payment if balance > 0 else 0,
-            "Principal Paid": principal_paid + extra_payment if balance > 0 else 0,
-            "Interest Paid": interest if balance > 0 else 0,
-            "Property Tax": property_tax,
-            "Insurance": insurance,
-            "PMI": pmi,
-            "Total Interest Paid": total_interest_paid,
-            "Remaining Balance": balance
-        })
-
-        # Stop if the loan is paid off early
-        if balance <= 0:
-            break
+    # Amortization schedule (property tax, insurance, and PMI are added to each payment); with a rounding mode,
+    # computed in whole cents so the balance ends at exactly zero
+    if rounding is None:
+        schedule = amortization_schedule(principal, monthly_rate, total_payments, extra_payment, property_tax + insurance + pmi)
+    else:
+        schedule = cents_amortization_schedule(principal, interest_rate, total_payments, extra_payment, property_tax + insurance + pmi, rounding)
 
     # Convert to DataFrame
-    df = pd.DataFrame(results)
+    df = mortgage_schedule_frame(schedule, property_tax, insurance, pmi)
+    return df
+
+def mortgage_schedule_frame(schedule, property_tax=0, insurance=0, pmi=0):
+    return pd.DataFrame({
+        "Month": schedule["Month"],
+        "Monthly Payment": schedule["Monthly Payment"],
+        "Principal Paid": schedule["Principal Paid"],
+        "Interest Paid": schedule["Interest Paid"],
+        "Property Tax": property_tax,
+        "Insurance": insurance,
+        "PMI": pmi,
+        "Total Interest Paid": schedule["Total Interest Paid"],
+        "Remaining Balance": schedule["Remaining Balance"]
+    })
+
+def iter_mortgage_schedule(principal, interest_rate, loan_term, property_tax=0, insurance=0, pmi=0, extra_payment=0, chunk_size=None):
+    # Stream the amortization schedule as row dicts, or as DataFrames of chunk_size rows
+    monthly_rate = (interest_rate / 100) / 12
+    total_payments = loan_term * 12
+    escrow = property_tax + insurance + pmi
+
+    for block in iter_amortization_chunks(principal, monthly_rate, total_payments, extra_payment, escrow, chunk_size or 120):
+        df = mortgage_schedule_frame(block, property_tax, insurance, pmi)
+        if chunk_size:
+            yield df
+        else:
+            yield from df.to_dict("records")
+
+def mortgage_recalculate(df, change_month, principal, interest_rate, loan_term, property_tax=0, insurance=0, pmi=0, extra_payment=0, lump_sum=0):
+    # Nothing to change if the loan was already paid off before change_month
+    if change_month > len(df):
+        return df
+
+    # Rows before change_month are reused as they are
+    prefix = df.iloc[:change_month - 1]
+    balance = prefix["Remaining Balance"].iloc[-1] if len(prefix) else principal
+    total_interest = prefix["Total Interest Paid"].iloc[-1] if len(prefix) else 0
+
+    # Recompute the rest of the schedule with the new extra payment (and lump sum at change_month)
+    monthly_rate = (interest_rate / 100) / 12
+    total_payments = loan_term * 12
+    payment = annuity_payment(principal, monthly_rate, total_payments)
+    suffix = reamortize_from(balance, total_interest, change_month, monthly_rate, total_payments, payment, extra_payment, property_tax + insurance + pmi, lump_sum)
+
+    return pd.concat([prefix, mortgage_schedule_frame(suffix, property_tax, insurance, pmi)], ignore_index=True)
+
+def mortgage_payoff(principal, interest_rate, loan_term, property_tax=0, insurance=0, pmi=0, extra_payment=0):
+    # Payoff month, total interest and final payment without building the schedule
+    escrow = property_tax + insurance + pmi
+    payoff = solve_payoff(principal, (interest_rate / 100) / 12, loan_term * 12, extra_payment)
+    payoff["Monthly Payment"] += escrow
+    payoff["Final Payment"] += escrow
+    return payoff
+
+def mortgage_scenario_grid(principal, interest_rates, loan_terms, extra_payments=(0,), pmis=(0,), property_tax=0, insurance=0):
+    # Every combination of interest rate, loan term, extra payment and PMI
+    rate_grid, term_grid, extra_grid, pmi_grid = (
+        grid.ravel() for grid in np.meshgrid(
+            np.asarray(interest_rates, dtype=float), np.asarray(loan_terms),
+            np.asarray(extra_payments, dtype=float), np.asarray(pmis, dtype=float), indexing="ij"
+        )
+    )
+
+    # Summaries are solved in closed form, so no monthly schedules are built
+    summary = payoff_summary(principal, (rate_grid / 100) / 12, term_grid * 12, extra_grid)
+    escrow = property_tax + insurance + pmi_grid
+    total_interest = summary["Total Interest Paid"]
+
+    df = pd.DataFrame({
+        "Interest Rate": rate_grid,
+        "Loan Term": term_grid,
+        "Extra Payment": extra_grid,
+        "PMI": pmi_grid,
+        "Monthly Payment": summary["Monthly Payment"] + escrow,
+        "Payoff Month": summary["Payoff Month"],
+        "Total Interest Paid": total_interest,
+        "Total PITI": principal + total_interest + escrow * summary["Payoff Month"]
+    })
+    return df
+
+def mortgage_grid_schedules(grid_df, principal, property_tax=0, insurance=0):
+    # Full amortization schedules, only for the scenario rows that are asked for
+    return [
+        mortgage_calculator(principal, row["Interest Rate"], int(row["Loan Term"]), property_tax, insurance, row["PMI"], row["Extra Payment"])
+        for _, row in grid_df.iterrows()
+    ]
+
+def arm_rate_path(initial_rate, loan_term, fixed_period_years, reset_interval_months, index_path, margin, periodic_cap, lifetime_cap, initial_cap=None, floor=0):
+    # Constant-rate segments: the initial fixed period, then one segment per reset
+    total_payments = loan_term * 12
+    fixed_months = min(fixed_period_years * 12, total_payments)
+    n_resets = -(-(total_payments - fixed_months) // reset_interval_months)
+    segment_lengths = [fixed_months] + [reset_interval_months] * n_resets
+    segment_lengths[-1] = total_payments - sum(segment_lengths[:-1])
+
+    # Index values per reset for one path or a (paths x resets) array; short paths repeat their last value
+    index_path = np.atleast_2d(np.asarray(index_path, dtype=float))
+    if index_path.shape[1] < n_resets:
+        index_path = np.pad(index_path, ((0, 0), (0, n_resets - index_path.shape[1])), mode="edge")
+
+    # Fully indexed rate at each reset, limited by the periodic and lifetime caps and the floor
+    rates = np.empty((index_path.shape[0], n_resets + 1))
+    rates[:, 0] = initial_rate
+    for reset in range(n_resets):
+        cap = initial_cap if reset == 0 and initial_cap is not None else periodic_cap
+        rate = np.clip(index_path[:, reset] + margin, rates[:, reset] - cap, rates[:, reset] + cap)
+        rates[:, reset + 1] = np.clip(rate, floor, initial_rate + lifetime_cap)
+
+    return rates, segment_lengths
+
+def arm_mortgage_calculator(principal, initial_rate, loan_term, fixed_period_years, reset_interval_months, index_path, margin, periodic_cap, lifetime_cap,
+                            property_tax=0, insurance=0, pmi=0, extra_payment=0, initial_cap=None, floor=0):
+    # Annual rate for each segment of a single index path
+    rates, segment_lengths = arm_rate_path(initial_rate, loan_term, fixed_period_years, reset_interval_months, index_path, margin, periodic_cap, lifetime_cap, initial_cap, floor)
+    rates = rates[0]
+
+    # Re-amortize at each reset over the remaining term
+    schedule = segment_amortization_schedule(principal, (rates / 100) / 12, segment_lengths, extra_payment, property_tax + insurance + pmi)
+
+    df = mortgage_schedule_frame(schedule, property_tax, insurance, pmi)
+    df.insert(1, "Interest Rate", np.repeat(rates, segment_lengths)[:len(df)])
+    return df
+
+def arm_stress_test(principal, initial_rate, loan_term, fixed_period_years, reset_interval_months, index_paths, margin, periodic_cap, lifetime_cap,
+                    property_tax=0, insurance=0, pmi=0, extra_payment=0, initial_cap=None, floor=0):
+    # One row per index path, computed segment by segment across all paths at once
+    rates, segment_lengths = arm_rate_path(initial_rate, loan_term, fixed_period_years, reset_interval_months, index_paths, margin, periodic_cap, lifetime_cap, initial_cap, floor)
+    summary = segment_payoff_summary(principal, (rates / 100) / 12, segment_lengths, extra_payment)
+
+    df = pd.DataFrame({
+        "Path": np.arange(1, len(rates) + 1),
+        "Max Interest Rate": rates.max(axis=1),
+        "Max Monthly Payment": summary["Max Monthly Payment"] + property_tax + insurance + pmi,
+        "Payoff Month": summary["Payoff Month"],
+        "Total Interest Paid": summary["Total Interest Paid"]
+    })
     return df
 
 def plot_mortgage_amortization(df, file_name):
@@ -116,6 +232,9 @@ if __name__ == "__main__":
             insurance = float(input("Enter the monthly homeowner’s insurance (optional, default is 0): ") or 0)
             pmi = float(input("Enter the monthly PMI (Private Mortgage Insurance, optional, default is 0): ") or 0)
             extra_payment = float(input("Enter the extra monthly payment (optional, default is 0): ") or 0)
+            rounding = input("Round to whole cents each month? Enter half_up, half_even, down, or up (optional, default is no rounding): ").strip().lower() or None
+            if rounding is not None and rounding not in ROUNDING_MODES:
+                raise ValueError(f"Invalid rounding mode. Choose {', '.join(ROUNDING_MODES)}.")
             file_name = input("Enter the base name for the output files (e.g., 'mortgage'): ")
             break
         except Exception as e:
@@ -124,7 +243,7 @@ if __name__ == "__main__":
     image_file = f"{file_name}.png"
     excel_file = f"{file_name}.xlsx"
 
-    df = mortgage_calculator(principal, interest_rate, loan_term, property_tax, insurance, pmi, extra_payment)
+    df = mortgage_calculator(principal, interest_rate, loan_term, property_tax, insurance, pmi, extra_payment, rounding)
     plot_mortgage_amortization(df, image_file)
     export_to_excel(df, excel_file)
     embed_chart_in_excel(excel_file, image_file)
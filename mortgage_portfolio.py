@@ -0,0 +1,146 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from openpyxl import load_workbook
+
+from amortization import balances_after, payoff_summary
+from mortgage import auto_adjust_column_width, embed_chart_in_excel
+
+TAPE_COLUMNS = ["principal", "interest_rate", "loan_term", "extra_payment", "property_tax", "insurance", "pmi"]
+
+def _run_chunk(chunk):
+    # Columnar arrays for one chunk of the loan tape
+    principal = chunk["principal"]
+    monthly_rate = (chunk["interest_rate"] / 100) / 12
+    total_payments = chunk["loan_term"] * 12
+    extra_payment = chunk["extra_payment"]
+    escrow = chunk["property_tax"] + chunk["insurance"] + chunk["pmi"]
+
+    # Per-loan aggregates from the closed-form payoff solution
+    summary = payoff_summary(principal, monthly_rate, total_payments, extra_payment)
+    payoff_month = summary["Payoff Month"]
+    paid_per_month = summary["Monthly Payment"] + extra_payment
+
+    # Monthly cash flows as a (loans x months) grid, zero after each loan's payoff month
+    months = np.arange(1, payoff_month.max() + 1)
+    opening_balance = balances_after(principal[:, None], monthly_rate[:, None], paid_per_month[:, None], months - 1)
+    active = months <= payoff_month[:, None]
+    final_month = months == payoff_month[:, None]
+    interest = np.where(active, opening_balance * monthly_rate[:, None], 0)
+    principal_paid = np.where(final_month, opening_balance, np.where(active, paid_per_month[:, None] - interest, 0))
+    escrow_paid = np.where(active, escrow[:, None], 0)
+
+    loans = {
+        "Monthly Payment": summary["Monthly Payment"] + escrow,
+        "Payoff Month": payoff_month,
+        "Total Interest Paid": summary["Total Interest Paid"],
+        "Total Paid": principal + summary["Total Interest Paid"] + escrow * payoff_month,
+    }
+    monthly = {
+        "Loans Outstanding": active.sum(axis=0),
+        "Principal Paid": principal_paid.sum(axis=0),
+        "Interest Paid": interest.sum(axis=0),
+        "Escrow Paid": escrow_paid.sum(axis=0),
+        "Remaining Balance": np.where(active, opening_balance - principal_paid, 0).sum(axis=0),
+    }
+    return loans, monthly
+
+def run_portfolio(tape, chunk_size=5000, workers=None):
+    # Split the tape into columnar chunks (optional tape columns default to 0)
+    columns = {
+        name: tape[name].to_numpy(dtype=float) if name in tape.columns else np.zeros(len(tape))
+        for name in TAPE_COLUMNS
+    }
+    columns["loan_term"] = columns["loan_term"].astype(int)
+    chunks = [
+        {name: values[start:start + chunk_size] for name, values in columns.items()}
+        for start in range(0, len(tape), chunk_size)
+    ]
+
+    # Compute the chunks across a process pool
+    if workers == 1:
+        results = [_run_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_run_chunk, chunks))
+
+    # Per-loan aggregates, in tape order
+    df_loans = pd.DataFrame({
+        name: np.concatenate([loans[name] for loans, _ in results])
+        for name in results[0][0]
+    })
+    df_loans.insert(0, "Loan ID", tape["loan_id"].to_numpy() if "loan_id" in tape.columns else np.arange(1, len(tape) + 1))
+
+    # Merge the monthly totals, padding shorter chunks with zeros
+    total_months = max(len(monthly["Interest Paid"]) for _, monthly in results)
+    monthly_totals = {name: np.zeros(total_months) for name in results[0][1]}
+    for _, monthly in results:
+        for name, values in monthly.items():
+            monthly_totals[name][:len(values)] += values
+
+    df_monthly = pd.DataFrame({"Month": np.arange(1, total_months + 1), **monthly_totals})
+    df_monthly["Loans Outstanding"] = df_monthly["Loans Outstanding"].astype(int)
+    df_monthly["Total Cash Flow"] = df_monthly["Principal Paid"] + df_monthly["Interest Paid"] + df_monthly["Escrow Paid"]
+    return df_loans, df_monthly
+
+def run_loan_tape(tape_file, chunk_size=5000, workers=None):
+    tape = pd.read_csv(tape_file)
+    return run_portfolio(tape, chunk_size, workers)
+
+def plot_portfolio_cash_flows(df, file_name):
+    # Plot the portfolio's monthly cash flow breakdown
+    plt.figure(figsize=(12, 7))
+    plt.plot(df["Month"], df["Principal Paid"], label="Principal Paid", color="blue")
+    plt.plot(df["Month"], df["Interest Paid"], label="Interest Paid", linestyle="--", color="orange")
+    plt.plot(df["Month"], df["Escrow Paid"], label="Escrow Paid", linestyle="-.", color="green")
+    plt.title("Portfolio Monthly Cash Flows")
+    plt.xlabel("Month")
+    plt.ylabel("Amount ($)")
+    plt.legend(loc="upper right")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(file_name)
+    plt.close()
+
+def export_to_excel(df, file_name):
+    with pd.ExcelWriter(file_name, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="Monthly Cash Flows")
+    workbook = load_workbook(file_name)
+    sheet = workbook["Monthly Cash Flows"]
+
+    dollar_columns = ["Principal Paid", "Interest Paid", "Escrow Paid", "Remaining Balance", "Total Cash Flow"]
+    for col_name in dollar_columns:
+        if col_name in df.columns:
+            col_letter = sheet.cell(row=1, column=df.columns.get_loc(col_name) + 1).column_letter
+            for row in range(2, sheet.max_row + 1):
+                cell = sheet[f"{col_letter}{row}"]
+                cell.number_format = '"$"#,##0.00'
+
+    workbook.save(file_name)
+
+if __name__ == "__main__":
+    while True:
+        try:
+            tape_file = input("Enter the path to the loan tape CSV: ")
+            workers = int(input(f"Enter the number of worker processes (optional, default is {os.cpu_count()}): ") or os.cpu_count())
+            file_name = input("Enter the base name for the output files (e.g., 'portfolio'): ")
+            break
+        except Exception as e:
+            print(f"Error: {e}. Please try again.")
+
+    image_file = f"{file_name}.png"
+    excel_file = f"{file_name}.xlsx"
+    loans_file = f"{file_name}_loans.csv"
+
+    df_loans, df_monthly = run_loan_tape(tape_file, workers=workers)
+    df_loans.to_csv(loans_file, index=False)
+    plot_portfolio_cash_flows(df_monthly, image_file)
+    export_to_excel(df_monthly, excel_file)
+    embed_chart_in_excel(excel_file, image_file)
+    auto_adjust_column_width(excel_file)
+
+    print(f"Per-loan results saved to {loans_file}.")
+    print(f"Portfolio cash flows saved to {excel_file} with a cash flow graph embedded.")
@@ -0,0 +1,56 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Contribution frequencies shared by all tools ("yearly" is an alias of "annually")
+PERIODS_PER_YEAR = {"daily": 365, "weekly": 52, "bi-weekly": 26, "monthly": 12, "quarterly": 4, "annually": 1, "yearly": 1}
+
+# Calendar step between periods: a number of days, or a number of months
+_DAY_STEPS = {365: 1, 52: 7, 26: 14}
+_MONTH_STEPS = {12: 1, 4: 3, 1: 12}
+
+CACHE_SIZE = 256
+
+def frequency_periods(frequency, default=12):
+    return PERIODS_PER_YEAR.get(frequency.lower(), default)
+
+def _period_end_dates(start_date, n_periods, per_year):
+    # Date each period ends, counted from start_date; month steps keep the start day, clipped to the length of the month
+    start = np.datetime64(start_date, "D")
+    steps = np.arange(1, n_periods + 1)
+    if per_year in _DAY_STEPS:
+        return start + steps * _DAY_STEPS[per_year]
+    if per_year not in _MONTH_STEPS:
+        return start + np.round(steps * 365 / per_year).astype(int)
+
+    month_starts = start.astype("datetime64[M]") + steps * _MONTH_STEPS[per_year]
+    days_in_month = ((month_starts + 1).astype("datetime64[D]") - month_starts.astype("datetime64[D]")).astype(int)
+    start_day = (start - start.astype("datetime64[M]").astype("datetime64[D]")).astype(int) + 1
+    return month_starts.astype("datetime64[D]") + (np.minimum(start_day, days_in_month) - 1)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_period_index(per_year, n_periods, start_date):
+    period = np.arange(1, n_periods + 1)
+    month = (period - 1) * 12 // per_year + 1
+    index = {"Period": period}
+    if start_date is not None:
+        index["Date"] = _period_end_dates(start_date, n_periods, per_year)
+    index["Month"] = month
+    index["Year"] = (month - 1) // 12 + 1
+
+    # Shared between callers through the cache, so the arrays are read-only
+    for values in index.values():
+        values.setflags(write=False)
+    return index
+
+def period_index(frequency, n_periods, start_date=None):
+    # Period number, month and year labels (and period end dates when start_date is given) for n_periods periods,
+    # built once per (frequency, n_periods, start_date) and cached. frequency may also be a number of periods per year.
+    per_year = frequency if isinstance(frequency, int) else frequency_periods(frequency)
+    return _cached_period_index(per_year, max(int(n_periods), 0), None if start_date is None else str(np.datetime64(start_date, "D")))
+
+def cache_info():
+    return _cached_period_index.cache_info()._asdict()
+
+def clear_cache():
+    _cached_period_index.cache_clear()
@@ -3,43 +3,40 @@ import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
-def personal_loan_calculator(loan_amount, interest_rate, loan_term, extra_payment=0):
+from amortization import amortization_schedule, iter_amortization_chunks, solve_payoff
+from cents_amortization import ROUNDING_MODES, cents_amortization_schedule
+
+def personal_loan_calculator(loan_amount, interest_rate, loan_term, extra_payment=0, rounding=None):
     # Monthly interest rate and total number of payments
     monthly_rate = (interest_rate / 100) / 12
     total_payments = loan_term * 12
 
-    # Calculate monthly payment
-    monthly_payment = loan_amount * monthly_rate / (1 - (1 + monthly_rate) ** -total_payments)
-
-    # Amortization schedule
-    balance = loan_amount
-    total_interest_paid = 0
-    results = []
-
-    for month in range(1, total_payments + 1):
-        interest = balance * monthly_rate
-        principal = monthly_payment - interest
-        total_interest_paid += interest
-        balance -= (principal + extra_payment)
-        balance = max(balance, 0)  # Prevent negative balances
-
-        results.append({
-            "Month": month,
-            "Monthly Payment": monthly_payment + extra_payment if balance > 0 else 0,
-            "Principal Paid": principal + extra_payment if balance > 0 else 0,
-            "Interest Paid": interest if balance > 0 else 0,
-            "Total Interest Paid": total_interest_paid,
-            "Remaining Balance": balance
-        })
-
-        # Stop if the loan is paid off early
-        if balance <= 0:
-            break
+    # Amortization schedule, in whole cents when a rounding mode is given
+    if rounding is None:
+        schedule = amortization_schedule(loan_amount, monthly_rate, total_payments, extra_payment)
+    else:
+        schedule = cents_amortization_schedule(loan_amount, interest_rate, total_payments, extra_payment, rounding=rounding)
 
     # Convert to DataFrame
-    df = pd.DataFrame(results)
+    df = pd.DataFrame(schedule)
     return df
 
+def iter_personal_loan_schedule(loan_amount, interest_rate, loan_term, extra_payment=0, chunk_size=None):
+    # Stream the amortization schedule as row dicts, or as DataFrames of chunk_size rows
+    monthly_rate = (interest_rate / 100) / 12
+    total_payments = loan_term * 12
+
+    for block in iter_amortization_chunks(loan_amount, monthly_rate, total_payments, extra_payment, chunk_size=chunk_size or 120):
+        df = pd.DataFrame(block)
+        if chunk_size:
+            yield df
+        else:
+            yield from df.to_dict("records")
+
+def personal_loan_payoff(loan_amount, interest_rate, loan_term, extra_payment=0):
+    # Payoff month, total interest and final payment without building the schedule
+    return solve_payoff(loan_amount, (interest_rate / 100) / 12, loan_term * 12, extra_payment)
+
 def plot_loan_amortization(df, file_name):
     # Plot principal vs. interest breakdown
     plt.figure(figsize=(12, 7))
@@ -107,6 +104,9 @@ if __name__ == "__main__":
             interest_rate = float(input("Enter the annual interest rate (in %): "))
             loan_term = int(input("Enter the loan term (in years): "))
             extra_payment = float(input("Enter the extra monthly payment (optional, default is 0): ") or 0)
+            rounding = input("Round to whole cents each month? Enter half_up, half_even, down, or up (optional, default is no rounding): ").strip().lower() or None
+            if rounding is not None and rounding not in ROUNDING_MODES:
+                raise ValueError(f"Invalid rounding mode. Choose {', '.join(ROUNDING_MODES)}.")
             file_name = input("Enter the base name for the output files (e.g., 'personal_loan'): ")
             break
         except Exception as e:
@@ -115,7 +115,7 @@ if __name__ == "__main__":
     image_file = f"{file_name}.png"
     excel_file = f"{file_name}.xlsx"
 
-    df = personal_loan_calculator(loan_amount, interest_rate, loan_term, extra_payment)
+    df = personal_loan_calculator(loan_amount, interest_rate, loan_term, extra_payment, rounding)
     plot_loan_amortization(df, image_file)
     export_to_excel(df, excel_file)
     embed_chart_in_excel(excel_file, image_file)
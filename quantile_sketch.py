@@ -0,0 +1,47 @@
+import numpy as np
+
+class QuantileSketch:
+    # Merging t-digest style sketch: values are folded into at most ~compression weighted centroids,
+    # kept small near the tails (asin scale function) so extreme percentiles stay accurate.
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        # Add a batch of values and compress straight away, so memory never grows with the number of batches
+        values = np.asarray(values, dtype=float).ravel()
+        if not values.size:
+            return
+        self.count += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        means = np.concatenate((self.means, values))
+        weights = np.concatenate((self.weights, np.ones(values.size)))
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        # Centroids whose cumulative-weight midpoint falls in the same unit of the scale function are merged
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = np.floor(self.compression / np.pi * np.arcsin(2 * q - 1))
+        starts = np.flatnonzero(np.concatenate(([True], k[1:] != k[:-1])))
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q):
+        # Interpolate between centroid means at their cumulative-weight midpoints, pinned to the exact min and max
+        if not self.count:
+            return np.full(np.shape(q), np.nan)
+        cumulative = np.cumsum(self.weights)
+        midpoints = np.concatenate(([0], cumulative - self.weights / 2, [self.count]))
+        means = np.concatenate(([self.min], self.means, [self.max]))
+        return np.interp(np.asarray(q, dtype=float) * self.count, midpoints, means)
+
+    def percentile(self, percentiles):
+        return self.quantile(np.asarray(percentiles, dtype=float) / 100)
@@ -1,14 +1,18 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
-def retirement_savings_planner(current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency="monthly"):
+from columnar import result_table
+from period_calendar import frequency_periods, period_index
+from quantile_sketch import QuantileSketch
+
+def _contribution_plan(current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency):
     years_to_retirement = retirement_age - current_age
 
     # Map contribution frequency to periods
-    freq_map = {"daily": 365, "weekly": 52, "bi-weekly": 26, "monthly": 12, "quarterly": 4, "annually": 1}
-    periods_per_year = freq_map.get(contribution_frequency.lower(), 12)
+    periods_per_year = frequency_periods(contribution_frequency)
     
     # Inflation-adjusted annual return rate
     annual_rate = annual_return / 100
@@ -21,43 +25,197 @@ def retirement_savings_planner(current_age, retirement_age, target_amount, curre
     periodic_contribution = (adjusted_target - current_savings * ((1 + periodic_rate) ** total_periods)) / (
         ((1 + periodic_rate) ** total_periods - 1) / periodic_rate
     )
+    return years_to_retirement, periods_per_year, periodic_rate, periodic_contribution
+
+def retirement_savings_planner(current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency="monthly",
+                               dtype="float64", structured=False, resolution="period", start_date=None):
+    # resolution: "summary" (one row for the whole horizon), "yearly" (one row per year) or "period" (yearly rows plus a
+    # row per period); the per-period details are only built for "period" and are None otherwise
+    if resolution not in ("summary", "yearly", "period"):
+        raise ValueError("Invalid resolution. Choose summary, yearly, or period.")
+    years_to_retirement, periods_per_year, periodic_rate, periodic_contribution = _contribution_plan(
+        current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency
+    )
+
+    # Every period at once: closed-form end balance B_k = B_0 * (1 + r)^k + c * ((1 + r)^k - 1) / r
+    total_periods = max(years_to_retirement, 0) * periods_per_year
+    growth = (1 + periodic_rate) ** np.arange(1, total_periods + 1)
+    end_balance = current_savings * growth + periodic_contribution * (growth - 1) / periodic_rate
+    start_balance = np.concatenate(([current_savings], end_balance[:-1]))
+    interest = start_balance * periodic_rate
+    contributions = np.full(total_periods, float(periodic_contribution))
 
-    year_summary = []
-    period_details = []
-    balance = current_savings
-
-    for year in range(1, years_to_retirement + 1):
-        year_start_balance = balance
-        total_contributions = 0
-        total_interest_earned = 0
-
-        for period in range(periods_per_year):
-            interest = balance * periodic_rate
-            balance += interest + periodic_contribution
-            total_contributions += periodic_contribution
-            total_interest_earned += interest
-
-            period_details.append({
-                "Year": current_age + year,
-                "Period": (year - 1) * periods_per_year + period + 1,
-                "Start Balance": balance - interest - periodic_contribution,
-                "Contribution": periodic_contribution,
-                "Interest Earned": interest,
-                "End Balance": balance
-            })
-
-        year_summary.append({
-            "Year": current_age + year,
-            "Start Balance": year_start_balance,
-            "Total Contributions": total_contributions,
-            "Interest Earned": total_interest_earned,
-            "End Balance": balance,
-        })
-
-    df_year_summary = pd.DataFrame(year_summary)
-    df_period_details = pd.DataFrame(period_details)
+    # Segmented reductions over the period array: one segment per year, or a single segment for the summary
+    segment_length = total_periods if resolution == "summary" else periods_per_year
+    segment_starts = np.arange(0, total_periods, max(segment_length, 1))
+    segment_ends = np.minimum(segment_starts + segment_length, total_periods) - 1
+    reduce = (lambda values: np.add.reduceat(values, segment_starts)) if total_periods else (lambda values: values[:0])
+    years = current_age + (segment_ends // periods_per_year + 1)
+    df_year_summary = result_table({
+        "Year": years,
+        "Start Balance": start_balance[segment_starts],
+        "Total Contributions": reduce(contributions),
+        "Interest Earned": reduce(interest),
+        "End Balance": end_balance[segment_ends],
+    }, dtype, structured)
+
+    df_period_details = None
+    if resolution == "period":
+        index = period_index(periods_per_year, total_periods, start_date)
+        df_period_details = result_table({
+            "Year": current_age + index["Year"],
+            "Period": index["Period"],
+            **({"Date": index["Date"]} if "Date" in index else {}),
+            "Start Balance": start_balance,
+            "Contribution": contributions,
+            "Interest Earned": interest,
+            "End Balance": end_balance,
+        }, dtype, structured)
     return df_year_summary, df_period_details, periodic_contribution
 
+def _real_year_growth(real_return, periods_per_year):
+    # Each year has a constant real rate, so its periods are one geometric series:
+    # growth of the balance over the year, and value at year end of one contribution per period
+    periodic_rate = real_return / periods_per_year
+    year_growth = (1 + periodic_rate) ** periods_per_year
+    with np.errstate(divide="ignore", invalid="ignore"):
+        year_annuity = np.where(periodic_rate == 0, periods_per_year, (year_growth - 1) / periodic_rate)
+    return year_growth, year_annuity
+
+def retirement_success_probability(current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency="monthly",
+                                   return_volatility=15, inflation_volatility=1, n_paths=100000, chunk_size=10000, percentiles=(5, 25, 50, 75, 95), seed=None):
+    # Contribute the planner's periodic contribution (constant in today's dollars) along randomized paths
+    years_to_retirement, periods_per_year, _, periodic_contribution = _contribution_plan(
+        current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency
+    )
+    rng = np.random.default_rng(seed)
+    sketches = [QuantileSketch() for _ in range(years_to_retirement)]
+    successes = 0
+
+    # Paths run chunk by chunk; only the sketches and the success count are kept between chunks
+    for first_path in range(0, n_paths, chunk_size):
+        paths = min(chunk_size, n_paths - first_path)
+        annual_returns = rng.normal(annual_return / 100, return_volatility / 100, (years_to_retirement, paths))
+        inflation = rng.normal(inflation_rate / 100, inflation_volatility / 100, (years_to_retirement, paths))
+
+        year_growth, year_annuity = _real_year_growth((1 + annual_returns) / (1 + inflation) - 1, periods_per_year)
+        price_level = np.cumprod(1 + inflation, axis=0)
+
+        real_balance = np.full(paths, float(current_savings))
+        for year in range(years_to_retirement):
+            real_balance = real_balance * year_growth[year] + periodic_contribution * year_annuity[year]
+            sketches[year].update(real_balance * price_level[year])
+
+        # Success means the nominal balance at retirement reaches the nominal target
+        if years_to_retirement > 0:
+            successes += np.count_nonzero(real_balance * price_level[-1] >= target_amount)
+        else:
+            successes += paths * (current_savings >= target_amount)
+
+    df_percentiles = pd.DataFrame({"Year": current_age + np.arange(1, years_to_retirement + 1)})
+    bands = np.array([sketch.percentile(percentiles) for sketch in sketches]).reshape(-1, len(percentiles))
+    for i, percentile in enumerate(percentiles):
+        df_percentiles[f"Balance P{percentile:g}"] = bands[:, i]
+    return successes / n_paths, df_percentiles, periodic_contribution
+
+WITHDRAWAL_STRATEGIES = ("fixed", "percentage", "guardrails")
+
+def retirement_decumulation(current_age, retirement_age, end_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency="monthly",
+                            withdrawal_strategy="fixed", withdrawal_rate=4, withdrawal_amount=None, guardrail_band=20, guardrail_adjustment=10,
+                            return_volatility=15, inflation_volatility=1, n_paths=50000, early_years=5, percentiles=(5, 25, 50, 75, 95), seed=None):
+    # Accumulate with the planner's contribution, then withdraw once a year from retirement_age to end_age, along randomized
+    # return and inflation paths. Everything is in today's dollars. Strategies:
+    #   fixed: withdrawal_amount a year (default withdrawal_rate % of the planned target)
+    #   percentage: withdrawal_rate % of the balance each year
+    #   guardrails: start at withdrawal_rate % of the balance at retirement; cut (raise) by guardrail_adjustment %
+    #               whenever the current withdrawal rate moves guardrail_band % above (below) the initial one
+    if withdrawal_strategy not in WITHDRAWAL_STRATEGIES:
+        raise ValueError(f"Invalid withdrawal strategy. Choose {', '.join(WITHDRAWAL_STRATEGIES)}.")
+    if end_age <= retirement_age:
+        raise ValueError("The age the money should last until must be after the retirement age.")
+    years_to_retirement, periods_per_year, _, periodic_contribution = _contribution_plan(
+        current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency
+    )
+    years_retired = end_age - retirement_age
+    total_years = years_to_retirement + years_retired
+
+    # The whole timeline's real returns as one (years x paths) draw
+    rng = np.random.default_rng(seed)
+    annual_returns = rng.normal(annual_return / 100, return_volatility / 100, (total_years, n_paths))
+    real_return = (1 + annual_returns) / (1 + rng.normal(inflation_rate / 100, inflation_volatility / 100, (total_years, n_paths))) - 1
+    balance = np.empty((total_years, n_paths))
+    withdrawals = np.zeros((total_years, n_paths))
+
+    # Accumulation phase
+    real_balance = np.full(n_paths, float(current_savings))
+    for year in range(years_to_retirement):
+        year_growth, year_annuity = _real_year_growth(real_return[year], periods_per_year)
+        real_balance = real_balance * year_growth + periodic_contribution * year_annuity
+        balance[year] = real_balance
+    retirement_balance = real_balance.copy()
+
+    # Withdrawal phase: withdraw at the start of each year, the rest earns that year's real return
+    initial_rate = withdrawal_rate / 100
+    if withdrawal_strategy == "fixed":
+        planned_target = target_amount / ((1 + inflation_rate / 100) ** years_to_retirement)
+        withdrawal = np.full(n_paths, float(withdrawal_amount if withdrawal_amount is not None else initial_rate * planned_target))
+    else:
+        withdrawal = initial_rate * retirement_balance
+    years_lasted = np.full(n_paths, years_retired)
+
+    for year in range(years_retired):
+        if withdrawal_strategy == "percentage":
+            withdrawal = initial_rate * real_balance
+        elif withdrawal_strategy == "guardrails" and year > 0:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                current_rate = withdrawal / real_balance
+            withdrawal = np.where(current_rate > initial_rate * (1 + guardrail_band / 100), withdrawal * (1 - guardrail_adjustment / 100),
+                                  np.where(current_rate < initial_rate * (1 - guardrail_band / 100), withdrawal * (1 + guardrail_adjustment / 100), withdrawal))
+
+        # The money runs out in the first year the balance cannot cover the full withdrawal
+        paid = np.minimum(withdrawal, real_balance)
+        years_lasted = np.where((paid < withdrawal) & (years_lasted == years_retired), year, years_lasted)
+        real_balance = (real_balance - paid) * (1 + real_return[years_to_retirement + year])
+        withdrawals[years_to_retirement + year] = paid
+        balance[years_to_retirement + year] = real_balance
+
+    lasted = years_lasted == years_retired
+    df_summary = pd.DataFrame([{
+        "Withdrawal Strategy": withdrawal_strategy,
+        "Probability Money Lasts": lasted.mean(),
+        "Median Years Money Lasts": np.median(years_lasted),
+        "Years Money Lasts P5": np.percentile(years_lasted, 5),
+        "Median Balance at Retirement": np.median(retirement_balance),
+        "Median Ending Balance": np.median(real_balance),
+        "Ending Balance P5": np.percentile(real_balance, 5),
+    }])
+
+    # Balance and withdrawal percentiles by age
+    df_by_age = pd.DataFrame({
+        "Age": current_age + np.arange(1, total_years + 1),
+        "Phase": np.where(np.arange(total_years) < years_to_retirement, "Accumulation", "Withdrawal"),
+    })
+    bands = np.percentile(balance, percentiles, axis=1)
+    for i, percentile in enumerate(percentiles):
+        df_by_age[f"Balance P{percentile:g}"] = bands[i]
+    df_by_age["Median Withdrawal"] = np.median(withdrawals, axis=1)
+    df_by_age["Share of Paths Depleted"] = (years_to_retirement + years_lasted[None, :] <= np.arange(total_years)[:, None]).mean(axis=1)
+
+    # Sequence-of-returns risk: outcomes by quintile of the average real return over the first years of retirement
+    early = real_return[years_to_retirement:years_to_retirement + early_years].mean(axis=0)
+    quintile = np.empty(n_paths, dtype=int)
+    quintile[np.argsort(early, kind="stable")] = np.arange(n_paths) * 5 // n_paths + 1
+    retired_return = real_return[years_to_retirement:].mean(axis=0)
+    df_sequence = pd.DataFrame([{
+        "Early Return Quintile": q,
+        "Average Early Real Return (%)": early[quintile == q].mean() * 100,
+        "Average Retirement Real Return (%)": retired_return[quintile == q].mean() * 100,
+        "Probability Money Lasts": lasted[quintile == q].mean(),
+        "Median Ending Balance": np.median(real_balance[quintile == q]),
+    } for q in range(1, 6)])
+
+    return df_summary, df_by_age, df_sequence
+
 def plot_retirement_savings(df, file_name):
     # Plot savings progress
     plt.figure(figsize=(12, 7))
@@ -105,7 +263,8 @@ def embed_chart_in_excel(file_name, image_file):
 def export_to_excel(df_year_summary, df_period_details, file_name):
     with pd.ExcelWriter(file_name, engine="openpyxl") as writer:
         df_year_summary.to_excel(writer, index=False, sheet_name="Yearly Summary")
-        df_period_details.to_excel(writer, index=False, sheet_name="Detailed Breakdown")
+        if df_period_details is not None:
+            df_period_details.to_excel(writer, index=False, sheet_name="Detailed Breakdown")
     workbook = load_workbook(file_name)
     
     # Apply formatting to the Yearly Summary sheet
@@ -118,15 +277,16 @@ def export_to_excel(df_year_summary, df_period_details, file_name):
                 cell = sheet[f"{col_letter}{row}"]
                 cell.number_format = '"$"#,##0.00'
 
-    # Apply formatting to the Detailed Breakdown sheet
-    sheet = workbook["Detailed Breakdown"]
-    dollar_columns = ["Start Balance", "Contribution", "Interest Earned", "End Balance"]
-    for col_name in dollar_columns:
-        if col_name in df_period_details.columns:
-            col_letter = sheet.cell(row=1, column=df_period_details.columns.get_loc(col_name) + 1).column_letter
-            for row in range(2, sheet.max_row + 1):
-                cell = sheet[f"{col_letter}{row}"]
-                cell.number_format = '"$"#,##0.00'
+    # Apply formatting to the Detailed Breakdown sheet (only written when the details were requested)
+    if df_period_details is not None:
+        sheet = workbook["Detailed Breakdown"]
+        dollar_columns = ["Start Balance", "Contribution", "Interest Earned", "End Balance"]
+        for col_name in dollar_columns:
+            if col_name in df_period_details.columns:
+                col_letter = sheet.cell(row=1, column=df_period_details.columns.get_loc(col_name) + 1).column_letter
+                for row in range(2, sheet.max_row + 1):
+                    cell = sheet[f"{col_letter}{row}"]
+                    cell.number_format = '"$"#,##0.00'
 
     workbook.save(file_name)
 
@@ -140,6 +300,23 @@ if __name__ == "__main__":
             annual_return = float(input("Enter the expected annual return rate (in %, e.g., 7): "))
             inflation_rate = float(input("Enter the expected annual inflation rate (optional, default is 0): ") or 0)
             contribution_frequency = input("Enter the contribution frequency ('daily', 'weekly', 'bi-weekly', 'monthly', 'quarterly', or 'annually'): ").lower()
+            resolution = input("Enter the level of detail ('summary', 'yearly', or 'period'; default is 'period'): ").lower() or "period"
+            if resolution not in {"summary", "yearly", "period"}:
+                raise ValueError("Invalid level of detail. Choose summary, yearly, or period.")
+            simulate = input("Do you want to estimate the probability of reaching your target with randomized returns? (yes or no, default is no): ").lower() == "yes"
+            if simulate:
+                return_volatility = float(input("Enter the annual return volatility (in %, default is 15): ") or 15)
+                inflation_volatility = float(input("Enter the annual inflation volatility (in %, default is 1): ") or 1)
+                n_paths = int(input("Enter the number of simulated paths (default is 100000): ") or 100000)
+            decumulate = input("Do you want to simulate withdrawals in retirement? (yes or no, default is no): ").lower() == "yes"
+            if decumulate:
+                end_age = int(input("Enter the age the money should last until (default is 95): ") or 95)
+                if end_age <= retirement_age:
+                    raise ValueError("The age the money should last until must be after the retirement age.")
+                withdrawal_strategy = input("Enter the withdrawal strategy ('fixed', 'percentage', or 'guardrails'; default is 'fixed'): ").lower() or "fixed"
+                if withdrawal_strategy not in WITHDRAWAL_STRATEGIES:
+                    raise ValueError("Invalid withdrawal strategy. Choose fixed, percentage, or guardrails.")
+                withdrawal_rate = float(input("Enter the initial withdrawal rate (in %, default is 4): ") or 4)
             file_name = input("Enter the base name for the output files (e.g., 'retirement_savings'): ")
             break
         except Exception as e:
@@ -149,7 +326,7 @@ if __name__ == "__main__":
     excel_file = f"{file_name}.xlsx"
 
     df_year_summary, df_period_details, periodic_contribution = retirement_savings_planner(
-        current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency
+        current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency, resolution=resolution
     )
     plot_retirement_savings(df_year_summary, image_file)
     export_to_excel(df_year_summary, df_period_details, excel_file)
@@ -159,3 +336,26 @@ if __name__ == "__main__":
     frequency_label = contribution_frequency.capitalize()
     print(f"Retirement savings details saved to {excel_file} with a progress graph embedded.")
     print(f"Required {frequency_label} Contribution: ${periodic_contribution:,.2f}")
+
+    if simulate:
+        success_probability, df_percentiles, _ = retirement_success_probability(
+            current_age, retirement_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency,
+            return_volatility, inflation_volatility, n_paths
+        )
+        simulation_file = f"{file_name}_simulation.csv"
+        df_percentiles.to_csv(simulation_file, index=False)
+        print(f"Simulated balance percentiles saved to {simulation_file}.")
+        print(f"Probability of Reaching the Target: {success_probability:.1%}")
+
+    if decumulate:
+        df_summary, df_by_age, df_sequence = retirement_decumulation(
+            current_age, retirement_age, end_age, target_amount, current_savings, annual_return, inflation_rate, contribution_frequency,
+            withdrawal_strategy, withdrawal_rate
+        )
+        by_age_file = f"{file_name}_withdrawals.csv"
+        sequence_file = f"{file_name}_sequence_risk.csv"
+        df_by_age.to_csv(by_age_file, index=False)
+        df_sequence.to_csv(sequence_file, index=False)
+        print(f"Balance and withdrawal percentiles by age saved to {by_age_file} (in today's dollars).")
+        print(f"Outcomes by early-retirement return quintile saved to {sequence_file}.")
+        print(f"Probability the Money Lasts to Age {end_age}: {df_summary['Probability Money Lasts'].iloc[0]:.1%}")
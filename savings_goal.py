@@ -3,7 +3,10 @@ import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
-def calculate_savings_goal(target_amount, current_savings, duration, is_years, return_rate, inflation_rate, contribution_frequency):
+from columnar import allocate_columns, result_table
+from period_calendar import frequency_periods, period_index
+
+def calculate_savings_goal(target_amount, current_savings, duration, is_years, return_rate, inflation_rate, contribution_frequency, dtype="float64", structured=False, start_date=None):
     # Convert duration to months or years
     if is_years:
         total_months = duration * 12
@@ -11,8 +14,7 @@ def calculate_savings_goal(target_amount, current_savings, duration, is_years, r
         total_months = duration
 
     # Map contribution frequency to periods
-    freq_map = {"daily": 365, "weekly": 52, "bi-weekly": 26, "monthly": 12, "quarterly": 4, "annually": 1}
-    periods_per_year = freq_map.get(contribution_frequency.lower(), 12)
+    periods_per_year = frequency_periods(contribution_frequency)
     total_periods = (total_months / 12) * periods_per_year
 
     # Calculate inflation-adjusted goal
@@ -26,22 +28,23 @@ def calculate_savings_goal(target_amount, current_savings, duration, is_years, r
         ((1 + periodic_rate) ** total_periods - 1) / periodic_rate
     )
 
-    results = []
+    # Preallocated result columns, filled in period by period
+    index = period_index(periods_per_year, int(total_periods), start_date)
+    period = index["Period"]
+    results = allocate_columns(["Contribution", "Interest Earned", "End Balance"], len(period), dtype)
     balance = current_savings
 
-    for period in range(1, int(total_periods) + 1):
+    for i in range(len(period)):
         interest = balance * periodic_rate
         balance += interest + contribution_per_period
 
-        results.append({
-            "Period": period,
-            "Year": period // periods_per_year,
-            "Contribution": contribution_per_period,
-            "Interest Earned": interest,
-            "End Balance": balance,
-        })
+        results["Contribution"][i] = contribution_per_period
+        results["Interest Earned"][i] = interest
+        results["End Balance"][i] = balance
 
-    df = pd.DataFrame(results)
+    # Year counts completed years, so it is derived here rather than taken from the calendar
+    labels = {"Period": period, **({"Date": index["Date"]} if "Date" in index else {}), "Year": period // periods_per_year}
+    df = result_table({**labels, **results}, dtype, structured)
     return df, contribution_per_period
 
 def plot_savings_goal(df, target_amount, file_name):
@@ -1,13 +1,18 @@
+import os
 import math
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
-def stock_growth_calculator(initial_investment, annual_rate, contribution, frequency, duration, is_duration_in_years, dividend_yield=0, reinvest_dividends=True):
+from columnar import allocate_columns, result_table
+from period_calendar import frequency_periods, period_index
+
+def stock_growth_calculator(initial_investment, annual_rate, contribution, frequency, duration, is_duration_in_years, dividend_yield=0, reinvest_dividends=True,
+                            dtype="float64", structured=False, start_date=None):
     # Map contribution frequencies to periods
-    freq_map = {"daily": 365, "weekly": 52, "bi-weekly": 26, "monthly": 12, "quarterly": 4, "annually": 1}
-    periods_per_year = freq_map.get(frequency, 12)
+    periods_per_year = frequency_periods(frequency)
     
     # Convert duration to periods
     total_periods = duration * periods_per_year if is_duration_in_years else duration
@@ -16,13 +21,18 @@ def stock_growth_calculator(initial_investment, annual_rate, contribution, frequ
     periodic_rate = (annual_rate / 100) / periods_per_year
     dividend_rate = (dividend_yield / 100) / periods_per_year
 
-    results = []
+    # Preallocated result columns, filled in period by period
+    index = period_index(periods_per_year, total_periods, start_date)
+    results = allocate_columns(
+        ["Total Contributions", "Dividends Earned (This Period)", "Growth (This Period)", "Total Dividends", "Total Growth", "Balance"],
+        len(index["Period"]), dtype
+    )
     balance = initial_investment
     total_contributions = initial_investment
     total_growth = 0
     total_dividends = 0
 
-    for period in range(1, total_periods + 1):
+    for i in range(len(index["Period"])):
         # Apply growth from market returns
         growth = balance * periodic_rate
         balance += growth
@@ -39,21 +49,183 @@ def stock_growth_calculator(initial_investment, annual_rate, contribution, frequ
         total_contributions += contribution
 
         # Save results at each period
-        results.append({
-            "Period": period,
-            "Year": math.ceil(period / periods_per_year),
-            "Total Contributions": total_contributions,
-            "Dividends Earned (This Period)": dividends,
-            "Growth (This Period)": growth,
-            "Total Dividends": total_dividends,
-            "Total Growth": total_growth,
-            "Balance": balance
-        })
-
-    # Convert results to DataFrame
-    df = pd.DataFrame(results)
-
-    return df
+        results["Total Contributions"][i] = total_contributions
+        results["Dividends Earned (This Period)"][i] = dividends
+        results["Growth (This Period)"][i] = growth
+        results["Total Dividends"][i] = total_dividends
+        results["Total Growth"][i] = total_growth
+        results["Balance"][i] = balance
+
+    # Convert results to a DataFrame (or a structured array)
+    labels = {name: values for name, values in index.items() if name != "Month"}
+    return result_table({**labels, **results}, dtype, structured)
+
+def _simulate_returns(rng, distribution, mean, volatility, return_series, shape):
+    # Periodic returns for a block of periods, one column per path
+    if distribution == "normal":
+        return rng.normal(mean, volatility, shape)
+    if distribution == "lognormal":
+        # Log-returns chosen so the expected periodic growth matches the deterministic rate
+        sigma = volatility
+        mu = np.log1p(mean) - sigma ** 2 / 2
+        return np.expm1(rng.normal(mu, sigma, shape))
+    if distribution == "bootstrap":
+        return rng.choice(return_series, size=shape)
+    raise ValueError("Invalid distribution. Choose normal, lognormal, or bootstrap.")
+
+def stock_growth_monte_carlo(initial_investment, annual_rate, contribution, frequency, duration, is_duration_in_years, dividend_yield=0, reinvest_dividends=True,
+                             annual_volatility=15, n_paths=10000, distribution="normal", return_series=None,
+                             percentiles=(5, 25, 50, 75, 95), chunk_size=60, seed=None):
+    # Map contribution frequencies to periods
+    periods_per_year = frequency_periods(frequency)
+
+    # Convert duration to periods
+    total_periods = duration * periods_per_year if is_duration_in_years else duration
+
+    # Periodic return distribution (return_series holds historical periodic returns in % for bootstrapping)
+    periodic_rate = (annual_rate / 100) / periods_per_year
+    periodic_volatility = (annual_volatility / 100) / math.sqrt(periods_per_year)
+    dividend_rate = (dividend_yield / 100) / periods_per_year
+    if return_series is not None:
+        return_series = np.asarray(return_series, dtype=float) / 100
+    rng = np.random.default_rng(seed)
+
+    balance = np.full(n_paths, float(initial_investment))
+    bands = []
+    mean_balance = []
+
+    # Simulate chunk_size periods at a time so memory stays at (chunk_size x n_paths) while percentiles stay exact
+    for first_period in range(0, total_periods, chunk_size):
+        n_periods = min(chunk_size, total_periods - first_period)
+        returns = _simulate_returns(rng, distribution, periodic_rate, periodic_volatility, return_series, (n_periods, n_paths))
+        block = np.empty((n_periods, n_paths))
+        for period in range(n_periods):
+            # Same order as the deterministic calculator: growth, then dividends, then the contribution
+            balance *= 1 + returns[period]
+            if reinvest_dividends:
+                balance *= 1 + dividend_rate
+            balance += contribution
+            block[period] = balance
+
+        bands.append(np.percentile(block, percentiles, axis=1).T)
+        mean_balance.append(block.mean(axis=1))
+
+    index = period_index(periods_per_year, total_periods)
+    bands = np.concatenate(bands) if bands else np.empty((0, len(percentiles)))
+    results = {
+        "Period": index["Period"],
+        "Year": index["Year"],
+        "Total Contributions": initial_investment + contribution * index["Period"],
+        "Mean Balance": np.concatenate(mean_balance) if mean_balance else np.empty(0),
+    }
+    for i, percentile in enumerate(percentiles):
+        results[f"Balance P{percentile:g}"] = bands[:, i]
+    return pd.DataFrame(results)
+
+def plot_stock_growth_bands(df, file_name):
+    # Plot the percentile bands of the simulated balance
+    band_columns = [col for col in df.columns if col.startswith("Balance P")]
+    plt.figure(figsize=(12, 7))
+    for i in range(len(band_columns) // 2):
+        lower, upper = band_columns[i], band_columns[-1 - i]
+        plt.fill_between(df["Period"], df[lower], df[upper], color="blue", alpha=0.15, label=f"{lower[8:]}-{upper[8:]} Band")
+    if len(band_columns) % 2:
+        median = band_columns[len(band_columns) // 2]
+        plt.plot(df["Period"], df[median], label=median, color="blue")
+    plt.plot(df["Period"], df["Total Contributions"], label="Total Contributions", linestyle="--", color="orange")
+    plt.title("Simulated Stock Investment Growth")
+    plt.xlabel("Period")
+    plt.ylabel("Balance ($)")
+    plt.legend(loc="upper left")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(file_name)
+    plt.close()
+
+def load_price_history(file_name, cache_file=None):
+    # Date, price and dividend columns from a CSV ("Date", "Close" or "Price", optional "Dividend"), parsed once into
+    # a .npy cache (by default <name>.prices.npy next to the CSV) and memory-mapped on every later load.
+    # If the cache cannot be written (e.g. a read-only folder), the parsed CSV is returned directly.
+    if cache_file is None:
+        cache_file = f"{os.path.splitext(file_name)[0]}.prices.npy"
+    if os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(file_name):
+        return np.load(cache_file, mmap_mode="r")
+
+    df = pd.read_csv(file_name, parse_dates=["Date"]).sort_values("Date")
+    price = df["Close"] if "Close" in df.columns else df["Price"]
+    dividend = df["Dividend"].fillna(0) if "Dividend" in df.columns else np.zeros(len(df))
+    days = df["Date"].to_numpy(dtype="datetime64[D]").astype(float)
+    history = np.column_stack((days, price.to_numpy(dtype=float), np.asarray(dividend, dtype=float)))
+
+    # Written to a temporary file and moved into place, so an interrupted write never leaves a broken cache
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, "wb") as f:
+            np.save(f, history)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return history
+    return np.load(cache_file, mmap_mode="r")
+
+def stock_growth_backtest(initial_investment, contribution, frequency, duration, is_duration_in_years, history_file, reinvest_dividends=True, cache_file=None):
+    # Map contribution frequencies to periods
+    periods_per_year = frequency_periods(frequency)
+
+    # Convert duration to periods
+    total_periods = duration * periods_per_year if is_duration_in_years else duration
+
+    history = load_price_history(history_file, cache_file)
+    days, price, dividend = history[:, 0], history[:, 1], history[:, 2]
+
+    # Rows of history between contributions, from the average number of rows per year in the file
+    rows_per_year = (len(days) - 1) / ((days[-1] - days[0]) / 365.25)
+    step = max(1, round(rows_per_year / periods_per_year))
+    window = total_periods * step
+    n_starts = len(days) - window
+    if n_starts <= 0:
+        raise ValueError("The price history is shorter than the investment duration.")
+
+    # Growth index of one unit, with or without dividends reinvested
+    if reinvest_dividends:
+        index = np.concatenate(([1.0], np.cumprod((price[1:] + dividend[1:]) / price[:-1])))
+    else:
+        index = price / price[0]
+
+    # A contribution at row t is worth index[end] / index[t] at the end of the window, so every start date
+    # needs sum(1 / index) over rows t + step, t + 2 * step, ...; running sums within each residue class mod step give them all at once
+    inverse = np.zeros(-(-len(index) // step) * step)
+    inverse[:len(index)] = 1 / index
+    running = np.cumsum(inverse.reshape(-1, step), axis=0).ravel()
+
+    start = np.arange(n_starts)
+    end = start + window
+    contributions_value = running[end] - running[start]
+    final_balance = index[end] * (initial_investment / index[start] + contribution * contributions_value)
+    total_contributions = initial_investment + contribution * total_periods
+
+    return pd.DataFrame({
+        "Start Date": days[start].astype("datetime64[D]"),
+        "End Date": days[end].astype("datetime64[D]"),
+        "Total Contributions": np.full(n_starts, float(total_contributions)),
+        "Final Balance": final_balance,
+        "Total Growth": final_balance - total_contributions,
+    })
+
+def plot_stock_backtest(df, file_name):
+    # Plot the final balance for each rolling start date
+    plt.figure(figsize=(12, 7))
+    plt.plot(df["Start Date"], df["Final Balance"], label="Final Balance", color="blue")
+    plt.plot(df["Start Date"], df["Total Contributions"], label="Total Contributions", linestyle="--", color="orange")
+    plt.title("Historical Backtest by Start Date")
+    plt.xlabel("Start Date")
+    plt.ylabel("Balance ($)")
+    plt.legend(loc="upper left")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(file_name)
+    plt.close()
 
 def plot_stock_growth(df, file_name):
     # Convert monetary columns to numeric for plotting
@@ -123,7 +295,8 @@ def export_to_excel(df, file_name):
     sheet = workbook["Stock Growth"]
 
     # Apply dollar formatting to specific columns
-    dollar_columns = ["Total Contributions", "Dividends Earned (This Period)", "Growth (This Period)", "Total Dividends", "Total Growth", "Balance"]
+    dollar_columns = ["Total Contributions", "Dividends Earned (This Period)", "Growth (This Period)", "Total Dividends", "Total Growth", "Balance", "Mean Balance", "Final Balance"]
+    dollar_columns += [col for col in df.columns if col.startswith("Balance P")]
     for col_name in dollar_columns:
         if col_name in df.columns:
             col_letter = sheet.cell(row=1, column=df.columns.get_loc(col_name) + 1).column_letter
@@ -170,17 +343,37 @@ if __name__ == "__main__":
 
     dividend_yield = float(input("Enter the dividend yield (in %, optional, default is 0): ") or 0)
     reinvest_dividends = input("Do you want dividends reinvested? (yes or no): ").lower() == "yes"
+    history_file = input("Enter a historical price CSV to backtest every start date (optional, leave blank to skip): ").strip()
+    simulate = not history_file and input("Do you want to simulate random returns (Monte Carlo)? (yes or no, default is no): ").lower() == "yes"
+    if simulate:
+        distribution = input("Enter the return distribution (normal, lognormal, bootstrap; default is normal): ").lower() or "normal"
+        return_series = None
+        if distribution == "bootstrap":
+            # One periodic return (in %) per line, at the contribution frequency
+            return_series = pd.read_csv(input("Enter the path to the historical return series CSV: "), header=None).iloc[:, 0].to_numpy()
+            annual_volatility = 0
+        else:
+            annual_volatility = float(input("Enter the annual volatility (in %, default is 15): ") or 15)
+        n_paths = int(input("Enter the number of simulated paths (default is 10000): ") or 10000)
     base_file_name = input("Enter the base name for the output files (e.g., 'results'): ")
 
     # Generate file names
     graph_file = f"{base_file_name}.png"
     excel_file = f"{base_file_name}.xlsx"
 
-    # Calculate stock growth
-    df = stock_growth_calculator(initial_investment, annual_rate, contribution, frequency, duration, is_duration_in_years, dividend_yield, reinvest_dividends)
+    # Calculate stock growth (one row per start date when backtesting, percentile bands when simulating)
+    if history_file:
+        df = stock_growth_backtest(initial_investment, contribution, frequency, duration, is_duration_in_years, history_file, reinvest_dividends)
+        plot_stock_backtest(df, graph_file)
+    elif simulate:
+        df = stock_growth_monte_carlo(initial_investment, annual_rate, contribution, frequency, duration, is_duration_in_years, dividend_yield, reinvest_dividends,
+                                      annual_volatility, n_paths, distribution, return_series)
+        plot_stock_growth_bands(df, graph_file)
+    else:
+        df = stock_growth_calculator(initial_investment, annual_rate, contribution, frequency, duration, is_duration_in_years, dividend_yield, reinvest_dividends)
+        plot_stock_growth(df, graph_file)
 
-    # Plot and export results
-    plot_stock_growth(df, graph_file)
+    # Export results
     export_to_excel(df, excel_file)
 
     # Embed the graph in the spreadsheet
@@ -0,0 +1,64 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from debt_payoff import debt_payoff_events, optimize_debt_payoff
+
+
+def make_debts(spec):
+    return [{"name": f"D{i}", "balance": balance, "interest_rate": rate, "min_payment": minimum} for i, (balance, rate, minimum) in enumerate(spec)]
+
+
+def brute_force(debts, extra_payment, objective):
+    # Best cost over every payoff order (focus 1.0), skipping orders that never pay everything off
+    costs = []
+    for order in itertools.permutations(debt["name"] for debt in debts):
+        try:
+            result = debt_payoff_events(debts, extra_payment=extra_payment, order=list(order))
+        except ValueError:
+            continue
+        interest, months = result["Total Interest Paid"], result["Months to Debt-Free"]
+        costs.append((interest, months) if objective == "interest" else (months, interest))
+    return min(costs) if costs else None
+
+
+def optimized_cost(debts, extra_payment, objective):
+    result = optimize_debt_payoff(debts, extra_payment, objective, focus_options=(1.0,), workers=1)
+    interest, months = result["Total Interest Paid"], result["Months to Debt-Free"]
+    return (interest, months) if objective == "interest" else (months, interest)
+
+
+CASES = [
+    # An infeasible branch early in the search must not end the search for its siblings
+    (make_debts([(5000, 30, 88.18), (60000, 30, 1708.90), (20000, 30, 300.48), (60000, 12, 705.00)]), 50),
+    # Snowball never pays off, avalanche does
+    (make_debts([(20000, 12, 215.14), (60000, 24, 1075.92)]), 200),
+    # Neither heuristic pays off, but some orderings do
+    (make_debts([(5000, 12, 61.55), (20000, 12, 122.19), (20000, 30, 578.69), (20000, 30, 372.68)]), 50),
+]
+
+
+@pytest.mark.parametrize("objective", ["interest", "months"])
+@pytest.mark.parametrize("debts, extra_payment", CASES)
+def test_matches_brute_force(debts, extra_payment, objective):
+    expected = brute_force(debts, extra_payment, objective)
+    assert optimized_cost(debts, extra_payment, objective) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("objective", ["interest", "months"])
+def test_random_cases_match_brute_force(objective):
+    rng = np.random.default_rng(11)
+    for _ in range(40):
+        spec = []
+        for _ in range(rng.integers(2, 5)):
+            balance, rate = float(rng.choice([5000, 20000, 60000])), float(rng.choice([12, 24, 30]))
+            spec.append((balance, rate, round(balance * rate / 1200 * rng.uniform(0.6, 1.6), 2)))
+        debts, extra_payment = make_debts(spec), float(rng.choice([0, 50, 200]))
+
+        expected = brute_force(debts, extra_payment, objective)
+        if expected is None:
+            with pytest.raises(ValueError):
+                optimize_debt_payoff(debts, extra_payment, objective, focus_options=(1.0,), workers=1)
+        else:
+            assert optimized_cost(debts, extra_payment, objective) == pytest.approx(expected)
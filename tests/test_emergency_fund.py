@@ -0,0 +1,40 @@
+import numpy as np
+
+from emergency_fund import calculate_emergency_fund, emergency_fund_months
+
+
+def simulated_months(monthly_expenses, coverage_months, current_savings, monthly_contribution, annual_return, inflation_rate, max_months=1200):
+    # Month-by-month reference: first month the balance covers the inflated target
+    target_fund = monthly_expenses * coverage_months
+    if current_savings >= target_fund:
+        return 0
+    monthly_rate = (annual_return / 100) / 12
+    balance = current_savings
+    for month in range(1, max_months + 1):
+        balance = balance * (1 + monthly_rate) + monthly_contribution
+        if balance >= target_fund * (1 + inflation_rate / 100) ** (month / 12) * (1 + 1e-12):
+            return month
+    return np.inf
+
+
+def test_crossing_overtaken_within_the_year():
+    # Caught up in month 5, but inflation pulls ahead again before month 12
+    assert emergency_fund_months(1000, 6, 5932.26, 177.88, 0, 35.85) == 5
+    df, _ = calculate_emergency_fund(1000, 6, 5932.26, 177.88, "monthly", 0, 35.85)
+    assert df["Month"].iloc[-1] == 5
+
+
+def test_matches_monthly_simulation():
+    rng = np.random.default_rng(20)
+    n = 2000
+    expenses = rng.uniform(500, 5000, n)
+    coverage = rng.integers(3, 13, n)
+    savings = rng.uniform(0, 1, n) * expenses * coverage
+    contribution = rng.uniform(0, 0.1, n) * expenses
+    annual_return = np.where(rng.random(n) < 0.5, 0, rng.uniform(-5, 12, n))
+    inflation = rng.uniform(1, 40, n)
+
+    months = emergency_fund_months(expenses, coverage, savings, contribution, annual_return, inflation)
+    expected = [simulated_months(*values) for values in zip(expenses, coverage, savings, contribution, annual_return, inflation)]
+
+    np.testing.assert_array_equal(months, expected)